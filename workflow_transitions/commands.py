@@ -0,0 +1,50 @@
+import click
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-transition-rollup")
+@click.option("--doctype", help="Only rebuild the rollup of this doctype")
+@click.option("--chunk-size", default=500, type=int, help="State Change documents per chunk")
+@pass_context
+def rebuild_transition_rollup(context, doctype=None, chunk_size=500):
+	"""Rebuild the Workflow Transition Rollup from State Change history"""
+	import frappe
+
+	from workflow_transitions.workflow_transitions.doctype.workflow_transition_rollup.workflow_transition_rollup import (
+		rebuild_rollup,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		total = rebuild_rollup(doctype, chunk_size=chunk_size)
+		click.echo(f"Rebuilt the transition rollup from {total} State Change documents")
+	finally:
+		frappe.destroy()
+
+
+@click.command("backfill-dwell-digests")
+@click.option("--doctype", help="Only backfill the digests of this doctype")
+@click.option("--from-date", help="First day to digest, defaults to the first recorded transition")
+@click.option("--to-date", help="Last day to digest, defaults to yesterday")
+@pass_context
+def backfill_dwell_digests(context, doctype=None, from_date=None, to_date=None):
+	"""Build the Workflow Dwell Digests of existing State Change history"""
+	import frappe
+
+	from workflow_transitions.workflow_transitions.doctype.workflow_dwell_digest.workflow_dwell_digest import (
+		backfill_dwell_digests,
+	)
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+	try:
+		total = backfill_dwell_digests(from_date, to_date, doctype)
+		click.echo(f"Built {total} daily dwell digests")
+	finally:
+		frappe.destroy()
+
+
+commands = [rebuild_transition_rollup, backfill_dwell_digests]
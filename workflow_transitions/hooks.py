@@ -138,9 +138,20 @@ app_license = "mit"
 # Hook on document methods and events
 
 doc_events = {
+	"*": {
+		"before_insert": "workflow_transitions.workflow_transitions.doc_events.document.before_insert",
+		"before_validate": "workflow_transitions.workflow_transitions.doc_events.document.before_validate",
+		"on_update": "workflow_transitions.workflow_transitions.doc_events.document.on_update",
+	},
 	"Workflow": {
 		"before_validate": "workflow_transitions.workflow_transitions.doc_events.workflow.before_validate",
-	}
+		"on_update": "workflow_transitions.workflow_transitions.doc_events.workflow.on_update",
+		"on_trash": "workflow_transitions.workflow_transitions.doc_events.workflow.on_trash",
+	},
+	"User": {
+		"on_update": "workflow_transitions.workflow_transitions.utils.roles.on_user_change",
+		"on_trash": "workflow_transitions.workflow_transitions.utils.roles.on_user_change",
+	},
 }
 
 # Scheduled Tasks
@@ -149,10 +160,12 @@ doc_events = {
 scheduler_events = {
 	"cron":{
 		"* * * * *": [
-			"workflow_transitions.workflow_transitions.doctype.workflow_reminder.workflow_reminder.send_notification",
-			"workflow_transitions.workflow_transitions.doctype.workflow_reminder.workflow_reminder.send_overdue_notification",
+			"workflow_transitions.workflow_transitions.doctype.workflow_reminder.workflow_reminder.process_due_reminders",
 		]
 	},
+	"daily": [
+		"workflow_transitions.workflow_transitions.doctype.workflow_dwell_digest.workflow_dwell_digest.build_daily_dwell_digests",
+	],
 }
 
 # Testing
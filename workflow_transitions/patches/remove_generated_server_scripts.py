@@ -0,0 +1,36 @@
+import frappe
+
+from workflow_transitions.workflow_transitions.utils.transition_config import clear_transition_config
+
+# Name prefixes of the Server Scripts generated per doctype before the doc_events dispatcher
+GENERATED_SCRIPT_PREFIXES = (
+	"Track State Transition For ",
+	"Before Validate for ",
+	"Add Approvers Before Validate for ",
+	"Before insert for ",
+	"Reminder For ",
+	"Workflow Email Trigger for ",
+)
+
+
+def execute():
+	"""
+	Delete the generated Server Scripts of doctypes whose Workflow is not in compatibility mode,
+	so they stop running next to the doc_events dispatcher.
+	"""
+	# The use_server_scripts Custom Field is synced from fixtures after post_model_sync patches,
+	# so on the first migrate no Workflow can be in compatibility mode yet
+	compatibility_mode = set()
+	if frappe.db.has_column("Workflow", "use_server_scripts"):
+		compatibility_mode.update(
+			frappe.get_all("Workflow", filters={"is_active": 1, "use_server_scripts": 1}, pluck="document_type")
+		)
+
+	for script in frappe.get_all("Server Script", fields=["name", "reference_doctype"]):
+		if script.reference_doctype in compatibility_mode:
+			continue
+		if script.name in {prefix + script.reference_doctype for prefix in GENERATED_SCRIPT_PREFIXES}:
+			frappe.delete_doc("Server Script", script.name, ignore_permissions=True)
+
+	clear_transition_config()
+
@@ -0,0 +1,14 @@
+import frappe
+
+
+def execute():
+	frappe.db.sql(
+		"""
+		UPDATE `tabState Change` sc
+		SET transition_count = (
+			SELECT COALESCE(MAX(sci.idx), 0)
+			FROM `tabState Change Items` sci
+			WHERE sci.parent = sc.name AND sci.parenttype = 'State Change'
+		)
+		"""
+	)
@@ -0,0 +1,142 @@
+import frappe
+
+from workflow_transitions.workflow_transitions.doctype.approvers.approvers import get_approvers
+from workflow_transitions.workflow_transitions.doctype.state_change.state_change import record_transition
+from workflow_transitions.workflow_transitions.doctype.workflow_email.workflow_email import trigger_workflow_emails
+from workflow_transitions.workflow_transitions.doctype.workflow_reminder.workflow_reminder import cancel_reminders
+from workflow_transitions.workflow_transitions.utils.transition_config import get_transition_config
+from workflow_transitions.workflow_transitions.utils.workflow_graph import get_workflow_graph
+
+
+def before_insert(doc, method=None):
+    config = get_transition_config(doc.doctype)
+    if config and config.track_state_transitions:
+        doc.workflow_changes = []
+
+
+def before_validate(doc, method=None):
+    config = get_transition_config(doc.doctype)
+    if not config:
+        return
+
+    detect_state_transition(doc)
+    if config.track_state_transitions:
+        track_state_transition(doc)
+        update_state_change(doc)
+        update_userdetail_workflow(doc)
+
+
+def on_update(doc, method=None):
+    config = get_transition_config(doc.doctype)
+    if not config:
+        return
+
+    old_state, new_state = get_state_transition(doc)
+    # The pair belongs to this save only
+    doc.flags.workflow_transition = None
+    if old_state == new_state:
+        return
+
+    if config.reminder:
+        cancel_reminders(doc.doctype, doc.name, new_state)
+        create_workflow_reminder(doc)
+    if config.workflow_email:
+        trigger_workflow_emails(doc, old_state, new_state)
+
+
+def detect_state_transition(doc):
+    """
+    Work out the (old_state, new_state) pair of the current save from the document
+    loaded before save, and share it with every handler through `doc.flags`.
+    """
+    doc_before_save = doc.get_doc_before_save()
+    old_state = doc_before_save.get("workflow_state") if doc_before_save else None
+    doc.flags.workflow_transition = (old_state, doc.get("workflow_state"))
+    return doc.flags.workflow_transition
+
+
+def get_state_transition(doc):
+    return doc.flags.workflow_transition or detect_state_transition(doc)
+
+
+def track_state_transition(doc):
+    """Record the new workflow state of `doc` in its State Change history."""
+    if not doc.name:
+        return
+
+    old_state, new_state = get_state_transition(doc)
+    if old_state == new_state:
+        return
+
+    user_roles = frappe.get_all(
+        "Has Role",
+        filters={"parent": frappe.session.user, "parenttype": "User"},
+        pluck="role",
+        order_by="idx",
+        limit=1,
+    )
+    role = user_roles[0] if user_roles else "No Role"
+
+    record_transition(doc.doctype, doc.name, new_state, frappe.session.user, role)
+
+
+def update_state_change(doc):
+    """Keep the `state_change` table of `doc` in sync with its workflow state."""
+    old_state, new_state = get_state_transition(doc)
+    if old_state == new_state:
+        return
+
+    graph = get_workflow_graph(doc.doctype)
+    workflow_role = graph.get_allow_edit_role(doc.workflow_state) if graph else None
+
+    if workflow_role and workflow_role in frappe.get_roles():
+        final_role = workflow_role
+    else:
+        final_role = "Unauthorized"
+
+    doc.state_change = [row for row in doc.state_change if row.workflow_state != doc.workflow_state]
+    doc.append("state_change", {
+        "username": frappe.db.get_value("User", frappe.session.user, "full_name"),
+        "modification_time": frappe.utils.now(),
+        "workflow_state": doc.workflow_state,
+        "role": final_role,
+    })
+
+
+def update_userdetail_workflow(doc):
+    """Fill `userdetail_workflow` with the users allowed to act on the current workflow state."""
+    graph = get_workflow_graph(doc.doctype)
+    if not graph:
+        frappe.throw(f"No workflow found for {doc.doctype}")
+    if not doc.workflow_state:
+        return
+
+    allowed_roles = graph.get_allow_edit_roles(doc.workflow_state)
+
+    # Collect all projects (header + items)
+    projects = []
+    if doc.get("project"):
+        projects.append(doc.get("project"))
+    for item in doc.get("items") or []:
+        if item.get("project"):
+            projects.append(item.get("project"))
+
+    doc.set("userdetail_workflow", get_approvers(allowed_roles, projects))
+
+
+def create_workflow_reminder(doc):
+    if frappe.get_all(
+        "Workflow Reminder",
+        # Cancelled reminders belong to an earlier visit of the state
+        filters={"document_name": doc.name, "doctype_name": doc.doctype, "workflow_state": doc.workflow_state, "cancelled": 0},
+        limit=1,
+    ):
+        return
+
+    doc_reminder = frappe.new_doc("Workflow Reminder")
+    doc_reminder.workflow_state = doc.workflow_state
+    doc_reminder.doctype_name = doc.doctype
+    doc_reminder.document_name = doc.name
+    doc_reminder.time = frappe.utils.now()
+    doc_reminder.description = f"Reminder for {doc.doctype} {doc.name} in state {doc.workflow_state}"
+    doc_reminder.save()
@@ -1,14 +1,128 @@
-import frappe 
+import frappe
+
+from workflow_transitions.workflow_transitions.utils.conditions import evaluate_condition
+from workflow_transitions.workflow_transitions.utils.transition_config import clear_transition_config
+from workflow_transitions.workflow_transitions.utils.workflow_graph import clear_workflow_graph, get_workflow_graph
+
+
 def before_validate(self,method):
     if self.is_active and self.track_state_transitions:
-        if frappe.db.exists("Server Script",f"Track State Transition For {self.document_type}"):
-            frappe.delete_doc("Server Script",f"Track State Transition For {self.document_type}")
-        server_script = frappe.new_doc("Server Script")
-        server_script.name = f"Track State Transition For {self.document_type}"
-        server_script.script_type = "DocType Event"
-        server_script.reference_doctype = self.document_type
-        server_script.doctype_event = "Before Validate"
-        server_script.script = """if doc.name:
+        # Tracking runs in-app through the doc_events["*"] dispatcher; the
+        # generated Server Scripts are only kept as an opt-in compatibility mode.
+        if self.get("use_server_scripts"):
+            create_tracking_server_scripts(self)
+        else:
+            delete_tracking_server_scripts(self)
+
+        meta = frappe.get_meta(self.document_type)
+        last_field = meta.fields[-1].fieldname if meta.fields else None
+
+        field_definitions = [
+            {"fieldname": "workflow_progress", "label": "Progress", "fieldtype": "Tab Break", "insert_after": last_field},
+            {"fieldname": "custom_html", "label": "HTML", "fieldtype": "HTML", "insert_after": "workflow_progress"},
+            {"fieldname": "state_change", "label": "State Change", "fieldtype": "Table", "options": "State Change Items", "insert_after": "custom_html"},
+            {"fieldname": "userdetail_workflow", "label": "State change user", "fieldtype": "Table", "options": "Approvers", "insert_after": "state_change"}
+        ]
+
+        existing_fieldnames = [df.fieldname for df in meta.get("fields")]
+        client_script_name = f"{self.document_type}-State Change"
+
+        for field in field_definitions:
+            if field["fieldname"] not in existing_fieldnames:
+                custom_field = frappe.new_doc("Custom Field")
+                custom_field.dt = self.document_type  
+                custom_field.fieldname = field["fieldname"]
+                custom_field.label = field["label"]
+                custom_field.fieldtype = field["fieldtype"]
+                if "options" in field:
+                    custom_field.options = field["options"]
+                custom_field.insert_after = field["insert_after"]
+                custom_field.insert()
+                frappe.msgprint(f"Created {field['fieldname']} field.")
+
+        frappe.db.commit()
+
+        
+        if frappe.db.exists("Client Script", client_script_name):
+            frappe.delete_doc("Client Script", client_script_name)
+
+        client_script = frappe.new_doc("Client Script")
+        client_script.dt = self.document_type
+        client_script.script_type = "Client"
+        client_script.enabled = 1
+        client_script.name = client_script_name
+        client_script.script = generate_client_script(self.document_type)
+        client_script.insert()
+        frappe.db.commit()
+    if self.is_active and not self.track_state_transitions:
+        client_script_name = f"{self.document_type}-State Change"
+
+        delete_tracking_server_scripts(self)
+        if frappe.db.exists("Client Script", client_script_name):
+            frappe.delete_doc("Client Script", client_script_name)
+        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"workflow_progress"}):
+            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "workflow_progress"})
+        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"state_change"}):
+            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "state_change"})
+        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"userdetail_workflow"}):
+            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "userdetail_workflow"})
+        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"custom_html"}):
+            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "custom_html"})
+    
+        # for reminder section
+    if self.is_active and self.reminder and self.get("use_server_scripts"):
+        create_server_script(f"Reminder For {self.document_type}", self.document_type, "After Save", REMINDER_SCRIPT)
+    elif self.is_active:
+        delete_server_script(f"Reminder For {self.document_type}")
+
+
+def on_update(self, method):
+    clear_transition_config()
+    clear_workflow_graph()
+
+
+def on_trash(self, method):
+    clear_transition_config()
+    clear_workflow_graph()
+
+
+def create_tracking_server_scripts(self):
+    create_server_script(f"Track State Transition For {self.document_type}", self.document_type, "Before Validate", TRACK_STATE_TRANSITION_SCRIPT)
+    create_server_script(f"Before Validate for {self.document_type}", self.document_type, "Before Validate", BEFORE_VALIDATE_SCRIPT)
+    create_server_script(f"Add Approvers Before Validate for {self.document_type}", self.document_type, "Before Validate", ADD_APPROVERS_SCRIPT)
+    create_server_script(f"Before insert for {self.document_type}", self.document_type, "Before Insert", BEFORE_INSERT_SCRIPT)
+
+
+def delete_tracking_server_scripts(self):
+    for script_name in (
+        f"Track State Transition For {self.document_type}",
+        f"Before Validate for {self.document_type}",
+        f"Add Approvers Before Validate for {self.document_type}",
+        f"Before insert for {self.document_type}",
+    ):
+        delete_server_script(script_name)
+
+
+def create_server_script(name, reference_doctype, doctype_event, script):
+    delete_server_script(name)
+
+    server_script = frappe.new_doc("Server Script")
+    server_script.name = name
+    server_script.script_type = "DocType Event"
+    server_script.reference_doctype = reference_doctype
+    server_script.doctype_event = doctype_event
+    server_script.script = script
+    server_script.save()
+
+
+def delete_server_script(name):
+    if frappe.db.exists("Server Script", name):
+        frappe.delete_doc("Server Script", name)
+
+
+# Server Script bodies used when a Workflow opts into `use_server_scripts`.
+# They mirror the handlers in doc_events/document.py.
+TRACK_STATE_TRANSITION_SCRIPT = """if doc.name:
                 prev_state_query = frappe.db.sql(
                     \"\"\"
                     SELECT sci.workflow_state 
@@ -58,18 +172,7 @@ def before_validate(self,method):
                     })
                     workflow_doc.save(ignore_permissions=True)"""
 
-        server_script.save()
-
-        # Create second server script with fixed structure
-        if frappe.db.exists("Server Script", f"Before Validate for {self.document_type}"):
-            frappe.delete_doc("Server Script", f"Before Validate for {self.document_type}")
-        
-        before_validate_server_script = frappe.new_doc("Server Script")
-        before_validate_server_script.name = f"Before Validate for {self.document_type}"
-        before_validate_server_script.script_type = "DocType Event"
-        before_validate_server_script.reference_doctype = self.document_type
-        before_validate_server_script.doctype_event = "Before Validate"
-        before_validate_server_script.script = """
+BEFORE_VALIDATE_SCRIPT = """
 def workflow_state(doc):
     workflow_name = frappe.db.get_value(
         "Workflow",
@@ -120,17 +223,8 @@ if previous_state != doc.workflow_state:
     workflow_state(doc)
 
 """
-     
-        before_validate_server_script.save()
-        if frappe.db.exists("Server Script", f"Add Approvers Before Validate for {self.document_type}"):
-            frappe.delete_doc("Server Script", f"Add Approvers Before Validate for {self.document_type}")
-        
-        add_approvers = frappe.new_doc("Server Script")
-        add_approvers.name = f"Add Approvers Before Validate for {self.document_type}"
-        add_approvers.script_type = "DocType Event"
-        add_approvers.reference_doctype = self.document_type
-        add_approvers.doctype_event = "Before Validate"
-        add_approvers.script = """
+
+ADD_APPROVERS_SCRIPT = """
 
 def update_userdetail_workflow(doc, method=None):
     workflow_name = frappe.db.get_value("Workflow", {"document_type": doc.doctype}, "name")
@@ -218,87 +312,10 @@ def update_userdetail_workflow(doc, method=None):
 
 update_userdetail_workflow(doc)
 """
-        add_approvers.save()
-        if frappe.db.exists("Server Script", f"Before insert for {self.document_type}"):
-            frappe.delete_doc("Server Script", f"Before insert for {self.document_type}")
-        
-        before_insert_server_script = frappe.new_doc("Server Script")
-        before_insert_server_script.name = f"Before insert for {self.document_type}"
-        before_insert_server_script.script_type = "DocType Event"
-        before_insert_server_script.reference_doctype = self.document_type
-        before_insert_server_script.doctype_event = "Before Insert"
-        before_insert_server_script.script = """doc.workflow_changes = []"""
-        before_insert_server_script.save()
 
-        meta = frappe.get_meta(self.document_type)
-        last_field = meta.fields[-1].fieldname if meta.fields else None
+BEFORE_INSERT_SCRIPT = """doc.workflow_changes = []"""
 
-        field_definitions = [
-            {"fieldname": "workflow_progress", "label": "Progress", "fieldtype": "Tab Break", "insert_after": last_field},
-            {"fieldname": "custom_html", "label": "HTML", "fieldtype": "HTML", "insert_after": "workflow_progress"},
-            {"fieldname": "state_change", "label": "State Change", "fieldtype": "Table", "options": "State Change Items", "insert_after": "custom_html"},
-            {"fieldname": "userdetail_workflow", "label": "State change user", "fieldtype": "Table", "options": "Approvers", "insert_after": "state_change"}
-        ]
-
-        existing_fieldnames = [df.fieldname for df in meta.get("fields")]
-        client_script_name = f"{self.document_type}-State Change"
-
-        for field in field_definitions:
-            if field["fieldname"] not in existing_fieldnames:
-                custom_field = frappe.new_doc("Custom Field")
-                custom_field.dt = self.document_type  
-                custom_field.fieldname = field["fieldname"]
-                custom_field.label = field["label"]
-                custom_field.fieldtype = field["fieldtype"]
-                if "options" in field:
-                    custom_field.options = field["options"]
-                custom_field.insert_after = field["insert_after"]
-                custom_field.insert()
-                frappe.msgprint(f"Created {field['fieldname']} field.")
-
-        frappe.db.commit()
-
-        
-        if frappe.db.exists("Client Script", client_script_name):
-            frappe.delete_doc("Client Script", client_script_name)
-
-        client_script = frappe.new_doc("Client Script")
-        client_script.dt = self.document_type
-        client_script.script_type = "Client"
-        client_script.enabled = 1
-        client_script.name = client_script_name
-        client_script.script = generate_client_script(self.document_type)
-        client_script.insert()
-        frappe.db.commit()
-    if self.is_active and not self.track_state_transitions:
-        client_script_name = f"{self.document_type}-State Change"
-
-        if frappe.db.exists("Server Script",f"Track State Transition For {self.document_type}"):
-            frappe.delete_doc("Server Script",f"Track State Transition For {self.document_type}")
-        if frappe.db.exists("Server Script", f"Before insert for {self.document_type}"):
-            frappe.delete_doc("Server Script", f"Before insert for {self.document_type}")
-        if frappe.db.exists("Client Script", client_script_name):
-            frappe.delete_doc("Client Script", client_script_name)
-        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"workflow_progress"}):
-            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "workflow_progress"})
-        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"state_change"}):
-            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "state_change"})
-        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"userdetail_workflow"}):
-            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "userdetail_workflow"})
-        if frappe.db.exists("Custom Field",{"dt":self.document_type},{"fieldname":"custom_html"}):
-            frappe.db.delete("Custom Field", {"dt": self.document_type,"fieldname": "custom_html"})
-    
-        # for reminder section
-    if self.is_active and self.reminder:
-        if frappe.db.exists("Server Script",f"Reminder For {self.document_type}"):
-            frappe.delete_doc("Server Script",f"Reminder For {self.document_type}")
-
-        server_script = frappe.new_doc("Server Script")
-        server_script.name = f"Reminder For {self.document_type}"
-        server_script.script_type = "DocType Event"
-        server_script.reference_doctype = self.document_type
-        server_script.doctype_event = "After Save"
-        server_script.script = """data = frappe.get_all("Workflow Reminder",
+REMINDER_SCRIPT = """data = frappe.get_all("Workflow Reminder",
         filters={"document_name": doc.name, "doctype_name": doc.doctype, "workflow_state": doc.workflow_state})
 if not data:
     doc_reminder = frappe.new_doc("Workflow Reminder")
@@ -310,97 +327,36 @@ if not data:
     
     doc_reminder.save()
         """
-        server_script.save()
-    if self.is_active and not self.reminder:
-        if frappe.db.exists("Server Script",f"Reminder For {self.document_type}"):
-            frappe.delete_doc("Server Script",f"Reminder For {self.document_type}")
+
 
 def generate_client_script(document_type):
     return f"frappe.ui.form.on('{document_type}', " +"""{
-    workflow_state:function(frm){
-        frm.trigger("onload")
-    },
-    onload: function(frm) {
+    refresh: function(frm) {
+        // Workflow actions reload the document, so redraw only when the saved version changed
+        if (frm.is_new() || frm.workflow_progress_modified === frm.doc.modified) {
+            return;
+        }
+        frm.workflow_progress_modified = frm.doc.modified;
         injectWorkflowCSS();
 
-        if (frm.doc.doctype && frm.doc.name && !frm.is_new()) {
-            frappe.call({
-                method: "frappe.client.get",
-                args: {
-                    doctype: frm.doc.doctype,
-                    name: frm.doc.name
-                },
-                callback: function(doc_response) {
-                    if (doc_response.message) {
-                        let doc = doc_response.message;
-                        
-                        frappe.call({
-                            method: "workflow_transitions.workflow_transitions.doc_events.workflow.get_workflow_transitions",
-                            args: {
-                                doc: frm.doc.doctype
-                            },
-                            callback: function(transition_response) {
-                                if (transition_response.message) {
-                                    let transitions = transition_response.message;
-                                    
-                                    transitions = filterTransitionsByConditions(transitions, doc);
-                                    let html = generateWorkflowHtml(transitions, frm.doc.state_change || []);
-                                    frm.fields_dict['custom_html'].wrapper.innerHTML = html;
-                                    initializeJsPlumb(transitions);
-                                }
-                            }
-                        });
-                    }
+        frappe.call({
+            method: "workflow_transitions.workflow_transitions.doc_events.workflow.get_workflow_progress",
+            args: {
+                doctype: frm.doc.doctype,
+                name: frm.doc.name
+            },
+            callback: function(r) {
+                if (r.message) {
+                    renderWorkflowProgress(frm, r.message);
                 }
-            });
-        }
+            }
+        });
     }
 });
 
-function convertPythonCondition(condition) {
-    if (!condition) return '';
-    
-    return condition
-        .replace(/\band\b/g, '&&')
-        .replace(/\bor\b/g, '||')
-        .replace(/\bTrue\b/g, 'true')
-        .replace(/\bFalse\b/g, 'false')
-        .replace(/\bNone\b/g, 'null')
-        .replace(/\bnot\b/g, '!')
-        .replace(/(\w+)\s*==\s*"([^"]*)"/, '$1 === "$2"')
-        .replace(/(\w+)\s*==\s*(\d+)/, '$1 === $2');
-}
-
-function filterTransitionsByConditions(transitions, doc) {
-    return transitions.filter(transition => {
-        if (!transition.condition) {
-            return true;
-        }
-        
-        try {
-            let jsCondition = convertPythonCondition(transition.condition);
-            
-            let context = {
-                doc: doc,
-                frappe: frappe,
-                int: parseInt,
-                str: String,
-                float: parseFloat
-            };
-            
-            try {
-                let fn = new Function('doc', 'frappe', 'int', 'str', 'float', 
-                    `try { return ${jsCondition}; } catch (e) { console.error(e); return false; }`);
-                return fn(doc, frappe, parseInt, String, parseFloat);
-            } catch (e) {
-                console.error('Error in condition execution:', e);
-                return false;
-            }
-        } catch (e) {
-            console.error('Error in condition conversion:', e);
-            return false;
-        }
-    });
+function renderWorkflowProgress(frm, progress) {
+    frm.fields_dict['custom_html'].wrapper.innerHTML = generateWorkflowHtml(progress.states);
+    initializeJsPlumb(progress.transitions);
 }
 
 function initializeJsPlumb(transitions) {
@@ -431,7 +387,7 @@ function initializeJsPlumb(transitions) {
                             t.next_state.replace(/\s+/g, '-').toLowerCase() === conn.targetId
                         );
                         let label = transition ? transition.action : '';
-                        if (transition && transition.condition) {
+                        if (transition && transition.conditional) {
                             label += ' ⚙️';
                         }
                         return label;
@@ -456,89 +412,38 @@ function initializeJsPlumb(transitions) {
                 anchor: ["Right", "Left"],
                 parameters: {
                     action: t.action,
-                    condition: t.condition
+                    conditional: t.conditional
                 }
             });
         });
     });
 }
 
-function getStateIndicator(state, items = [], currentState = '', transitions = []) {
-    if (!Array.isArray(items)) items = [];
-    if (!Array.isArray(transitions)) transitions = [];
-
-    // Sort items by modification time to get state history
-    const sortedItems = [...items].sort((a, b) => {
-        return new Date(a.modification_time) - new Date(b.modification_time);
-    });
-
-    // Get the latest state from sorted items
-    const latestState = sortedItems.length > 0 
-        ? sortedItems[sortedItems.length - 1].workflow_state
-        : '';
-
-    // Check if this state exists in history
-    const stateExists = sortedItems.some(item => 
-        item.workflow_state &&
-        item.workflow_state.trim().toLowerCase() === state.trim().toLowerCase()
-    );
-
-    // If state exists in history, show checkmark or cross
-    if (stateExists) {
-        const negativeStates = ['cancel', 'reject', 'declined', 'rejected', 'cancelled'];
-        const isNegativeState = negativeStates.some(negState => 
-            state.toLowerCase().includes(negState.toLowerCase())
-        );
-        
-        return isNegativeState 
-            ? '<span class="state-indicator negative">✗</span>' 
-            : '<span class="state-indicator positive">✓</span>';
+function getStateIndicator(indicator) {
+    // The indicator is worked out on the server from the state history and the allowed transitions
+    if (indicator === 'done') {
+        return '<span class="state-indicator positive">✓</span>';
     }
-
-    // Check if this is a possible next state from the latest state
-    const isNextPossibleState = transitions.some(transition => 
-        transition.state &&
-        transition.state.toLowerCase() === latestState.toLowerCase() &&
-        transition.next_state.toLowerCase() === state.toLowerCase()
-    );
-
-    // Show question mark only for next possible states that haven't been reached yet
-    if (isNextPossibleState && !stateExists) {
+    if (indicator === 'rejected') {
+        return '<span class="state-indicator negative">✗</span>';
+    }
+    if (indicator === 'next') {
         return '<span class="state-indicator next">?</span>';
     }
-
     return '';
 }
 
-function generateWorkflowHtml(transitions, items = []) {
-    let allStates = new Set();
-    let stateRoles = new Map(); // Map to store roles for each state
-    
-    transitions.forEach(t => {
-        allStates.add(t.state);
-        allStates.add(t.next_state);
-        
-        // Store roles for states
-        if (t.allowed && t.state) {
-            stateRoles.set(t.state, t.allowed);
-        }
-        if (t.allowed && t.next_state) {
-            stateRoles.set(t.next_state, t.allowed);
-        }
-    });
-
+function generateWorkflowHtml(states = []) {
     let html = `<div id="workflow-container">
                     <div class="workflow-states">`;
 
-    Array.from(allStates).forEach(state => {
-        let stateId = state.replace(/\s+/g, '-').toLowerCase();
-        let stateIndicator = getStateIndicator(state, items, "", transitions);
-        let role = stateRoles.get(state) || 'Any';
+    states.forEach(s => {
+        let stateId = s.state.replace(/\s+/g, '-').toLowerCase();
         
         html += `<div class="workflow-state" id="${stateId}">
                     <div class="state-content">
-                        <div class="state-text">${state}${stateIndicator}</div>
-                        <div class="state-role">${role}</div>
+                        <div class="state-text">${s.state}${getStateIndicator(s.indicator)}</div>
+                        <div class="state-role">${s.role}</div>
                     </div>
                 </div>`;
     });
@@ -642,24 +547,115 @@ function injectWorkflowCSS() {
 
 @frappe.whitelist()
 def get_workflow_fields(doc):
-    data = frappe.db.sql(f"""
-    select w.name as workflow_name, wds.state, wds.allow_edit
-    from `tabWorkflow` as w
-    join `tabWorkflow Document State` as wds on w.name = wds.parent
-    where w.document_type = '{doc}' and w.is_active = 1
-    order by wds.idx
-    """, as_dict=True)
-    return data
+    graph = get_workflow_graph(doc)
+    if not graph:
+        return []
+
+    return [
+        frappe._dict(workflow_name=graph.name, state=state.state, allow_edit=state.allow_edit)
+        for state in graph.states
+    ]
 
 @frappe.whitelist()
 def get_workflow_transitions(doc):
-    transitions = frappe.db.sql(f"""
-        SELECT w.name AS workflow_name, wds.state, wds.next_state, wds.allowed, wds.condition
-        FROM `tabWorkflow` AS w
-        JOIN `tabWorkflow Transition` AS wds ON w.name = wds.parent
-        WHERE w.document_type = '{doc}' AND w.is_active = 1
-        ORDER BY wds.idx
-    """, as_dict=True)
-    
-    return transitions
-    
\ No newline at end of file
+    graph = get_workflow_graph(doc)
+    if not graph:
+        return []
+
+    return [
+        frappe._dict(
+            workflow_name=graph.name,
+            state=transition.state,
+            action=transition.action,
+            next_state=transition.next_state,
+            allowed=transition.allowed,
+            condition=transition.condition,
+        )
+        for transition in graph.transitions
+    ]
+
+
+# States whose name contains one of these are shown as rejected once reached
+NEGATIVE_STATES = ("cancel", "reject", "declined")
+
+
+@frappe.whitelist()
+def get_workflow_progress(doctype, name):
+    """
+    Everything the workflow progress panel of one document needs, in one call: the transitions
+    whose condition holds for the document (evaluated with safe_eval), its State Change history,
+    and each state with its role and indicator ("done", "rejected", "next" or "").
+    """
+    doc = frappe.get_doc(doctype, name)
+    doc.check_permission("read")
+
+    graph = get_workflow_graph(doctype)
+    if not graph:
+        return {"transitions": [], "history": [], "states": []}
+
+    from frappe.model.workflow import get_workflow_safe_globals
+
+    eval_globals = get_workflow_safe_globals()
+    eval_locals = {"doc": doc.as_dict()}
+
+    transitions = []
+    for transition in graph.transitions:
+        if transition.condition:
+            try:
+                if not evaluate_condition(transition.condition, eval_globals, eval_locals):
+                    continue
+            except Exception:
+                continue
+
+        transitions.append(frappe._dict(
+            state=transition.state,
+            action=transition.action,
+            next_state=transition.next_state,
+            allowed=transition.allowed,
+            conditional=1 if transition.condition else 0,
+        ))
+
+    history = frappe.db.sql("""
+        SELECT sci.workflow_state, sci.username, sci.role, sci.modification_time
+        FROM `tabState Change` AS sc
+        JOIN `tabState Change Items` AS sci ON sci.parent = sc.name
+        WHERE sc.doctype_name = %s AND sc.document_name = %s
+        ORDER BY sci.modification_time
+    """, (doctype, name), as_dict=True)
+
+    return {
+        "transitions": transitions,
+        "history": history,
+        "states": get_state_indicators(transitions, history),
+    }
+
+
+def get_state_indicators(transitions, history):
+    """States in workflow order with the role shown for them and their progress indicator."""
+    roles = {}
+    for transition in transitions:
+        for state in (transition.state, transition.next_state):
+            if transition.allowed:
+                roles[state] = transition.allowed
+            else:
+                roles.setdefault(state, None)
+
+    reached = {(row.workflow_state or "").strip().lower() for row in history}
+    latest_state = (history[-1].workflow_state or "").lower() if history else ""
+    next_states = {
+        transition.next_state.lower()
+        for transition in transitions
+        if (transition.state or "").lower() == latest_state
+    }
+
+    states = []
+    for state, role in roles.items():
+        if state.strip().lower() in reached:
+            indicator = "rejected" if any(word in state.lower() for word in NEGATIVE_STATES) else "done"
+        elif state.lower() in next_states:
+            indicator = "next"
+        else:
+            indicator = ""
+        states.append(frappe._dict(state=state, role=role or "Any", indicator=indicator))
+
+    return states
@@ -1,9 +1,40 @@
 # Copyright (c) 2025, info@finbyz.tech and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
+from workflow_transitions.workflow_transitions.utils.roles import get_role_users
+
 
 class Approvers(Document):
 	pass
+
+
+def get_approvers(roles, projects=None):
+	"""
+	Return the enabled users holding any of `roles` as Approvers rows.
+	When `projects` are given, only users with a Project User Permission on one of them
+	are kept, falling back to every enabled role holder if nobody has access.
+	"""
+	role_users = get_role_users(roles or [])
+	if not role_users:
+		return []
+
+	approvers = role_users
+	if projects:
+		users_with_access = set(
+			frappe.get_all(
+				"User Permission",
+				filters={
+					"user": ["in", list({row.user for row in role_users})],
+					"allow": "Project",
+					"for_value": ["in", list(set(projects))],
+				},
+				pluck="user",
+				distinct=True,
+			)
+		)
+		approvers = [row for row in role_users if row.user in users_with_access] or role_users
+
+	return [{"user": row.user, "user_name": row.full_name, "role": row.role} for row in approvers]
@@ -9,6 +9,7 @@ from frappe import _
 from collections import namedtuple
 from frappe.utils.safe_exec import get_safe_globals
 from frappe.utils import nowdate
+from workflow_transitions.workflow_transitions.utils.conditions import evaluate_condition
 
 
 class DocumentShift(Document):
@@ -26,6 +27,6 @@ class DocumentShift(Document):
                 temp_doc = frappe.new_doc(self.doctype_name)                
                 if row.condition:
                     try:
-                        frappe.safe_eval(row.condition, None, self.get_context(temp_doc.as_dict()))
+                        evaluate_condition(row.condition, None, self.get_context(temp_doc.as_dict()))
                     except Exception:
                         frappe.throw(_("The Condition '{0}' is invalid").format(row.condition))
\ No newline at end of file
@@ -4,31 +4,14 @@ frappe.ui.form.on('State Change', {
 
         if (frm.doc.doctype_name && frm.doc.document_name) {
             frappe.call({
-                method: "frappe.client.get",
+                method: "workflow_transitions.workflow_transitions.doc_events.workflow.get_workflow_progress",
                 args: {
                     doctype: frm.doc.doctype_name,
                     name: frm.doc.document_name
                 },
-                callback: function(doc_response) {
-                    if (doc_response.message) {
-                        let doc = doc_response.message;
-                        
-                        frappe.call({
-                            method: "workflow_transitions.workflow_transitions.doc_events.workflow.get_workflow_transitions",
-                            args: {
-                                doc: frm.doc.doctype_name
-                            },
-                            callback: function(transition_response) {
-                                if (transition_response.message) {
-                                    let transitions = transition_response.message;
-                                    
-                                    transitions = filterTransitionsByConditions(transitions, doc);
-                                    let html = generateWorkflowHtml(transitions, frm.doc.items || []);
-                                    frm.fields_dict['custom_html'].wrapper.innerHTML = html;
-                                    initializeJsPlumb(transitions);
-                                }
-                            }
-                        });
+                callback: function(r) {
+                    if (r.message) {
+                        renderWorkflowProgress(frm, r.message);
                     }
                 }
             });
@@ -36,50 +19,9 @@ frappe.ui.form.on('State Change', {
     }
 });
 
-function convertPythonCondition(condition) {
-    if (!condition) return '';
-    
-    return condition
-        .replace(/\band\b/g, '&&')
-        .replace(/\bor\b/g, '||')
-        .replace(/\bTrue\b/g, 'true')
-        .replace(/\bFalse\b/g, 'false')
-        .replace(/\bNone\b/g, 'null')
-        .replace(/\bnot\b/g, '!')
-        .replace(/(\w+)\s*==\s*"([^"]*)"/, '$1 === "$2"')
-        .replace(/(\w+)\s*==\s*(\d+)/, '$1 === $2');
-}
-
-function filterTransitionsByConditions(transitions, doc) {
-    return transitions.filter(transition => {
-        if (!transition.condition) {
-            return true;
-        }
-        
-        try {
-            let jsCondition = convertPythonCondition(transition.condition);
-            
-            let context = {
-                doc: doc,
-                frappe: frappe,
-                int: parseInt,
-                str: String,
-                float: parseFloat
-            };
-            
-            try {
-                let fn = new Function('doc', 'frappe', 'int', 'str', 'float', 
-                    `try { return ${jsCondition}; } catch (e) { console.error(e); return false; }`);
-                return fn(doc, frappe, parseInt, String, parseFloat);
-            } catch (e) {
-                console.error('Error in condition execution:', e);
-                return false;
-            }
-        } catch (e) {
-            console.error('Error in condition conversion:', e);
-            return false;
-        }
-    });
+function renderWorkflowProgress(frm, progress) {
+    frm.fields_dict['custom_html'].wrapper.innerHTML = generateWorkflowHtml(progress.states);
+    initializeJsPlumb(progress.transitions);
 }
 
 function initializeJsPlumb(transitions) {
@@ -110,7 +52,7 @@ function initializeJsPlumb(transitions) {
                             t.next_state.replace(/\s+/g, '-').toLowerCase() === conn.targetId
                         );
                         let label = transition ? transition.action : '';
-                        if (transition && transition.condition) {
+                        if (transition && transition.conditional) {
                             label += ' ⚙️';
                         }
                         return label;
@@ -135,89 +77,38 @@ function initializeJsPlumb(transitions) {
                 anchor: ["Right", "Left"],
                 parameters: {
                     action: t.action,
-                    condition: t.condition
+                    conditional: t.conditional
                 }
             });
         });
     });
 }
 
-function getStateIndicator(state, items = [], currentState = '', transitions = []) {
-    if (!Array.isArray(items)) items = [];
-    if (!Array.isArray(transitions)) transitions = [];
-
-    // Sort items by modification time to get state history
-    const sortedItems = [...items].sort((a, b) => {
-        return new Date(a.modification_time) - new Date(b.modification_time);
-    });
-
-    // Get the latest state from sorted items
-    const latestState = sortedItems.length > 0 
-        ? sortedItems[sortedItems.length - 1].workflow_state
-        : '';
-
-    // Check if this state exists in history
-    const stateExists = sortedItems.some(item => 
-        item.workflow_state &&
-        item.workflow_state.trim().toLowerCase() === state.trim().toLowerCase()
-    );
-
-    // If state exists in history, show checkmark or cross
-    if (stateExists) {
-        const negativeStates = ['cancel', 'reject', 'declined', 'rejected', 'cancelled'];
-        const isNegativeState = negativeStates.some(negState => 
-            state.toLowerCase().includes(negState.toLowerCase())
-        );
-        
-        return isNegativeState 
-            ? '<span class="state-indicator negative">✗</span>' 
-            : '<span class="state-indicator positive">✓</span>';
+function getStateIndicator(indicator) {
+    // The indicator is worked out on the server from the state history and the allowed transitions
+    if (indicator === 'done') {
+        return '<span class="state-indicator positive">✓</span>';
     }
-
-    // Check if this is a possible next state from the latest state
-    const isNextPossibleState = transitions.some(transition => 
-        transition.state &&
-        transition.state.toLowerCase() === latestState.toLowerCase() &&
-        transition.next_state.toLowerCase() === state.toLowerCase()
-    );
-
-    // Show question mark only for next possible states that haven't been reached yet
-    if (isNextPossibleState && !stateExists) {
+    if (indicator === 'rejected') {
+        return '<span class="state-indicator negative">✗</span>';
+    }
+    if (indicator === 'next') {
         return '<span class="state-indicator next">?</span>';
     }
-
     return '';
 }
 
-function generateWorkflowHtml(transitions, items = []) {
-    let allStates = new Set();
-    let stateRoles = new Map(); // Map to store roles for each state
-    
-    transitions.forEach(t => {
-        allStates.add(t.state);
-        allStates.add(t.next_state);
-        
-        // Store roles for states
-        if (t.allowed && t.state) {
-            stateRoles.set(t.state, t.allowed);
-        }
-        if (t.allowed && t.next_state) {
-            stateRoles.set(t.next_state, t.allowed);
-        }
-    });
-
+function generateWorkflowHtml(states = []) {
     let html = `<div id="workflow-container">
                     <div class="workflow-states">`;
 
-    Array.from(allStates).forEach(state => {
-        let stateId = state.replace(/\s+/g, '-').toLowerCase();
-        let stateIndicator = getStateIndicator(state, items, "", transitions);
-        let role = stateRoles.get(state) || 'Any';
+    states.forEach(s => {
+        let stateId = s.state.replace(/\s+/g, '-').toLowerCase();
         
         html += `<div class="workflow-state" id="${stateId}">
                     <div class="state-content">
-                        <div class="state-text">${state}${stateIndicator}</div>
-                        <div class="state-role">${role}</div>
+                        <div class="state-text">${s.state}${getStateIndicator(s.indicator)}</div>
+                        <div class="state-role">${s.role}</div>
                     </div>
                 </div>`;
     });
@@ -1,9 +1,100 @@
 # Copyright (c) 2024, info@finbyz.tech and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
+from frappe.utils import cint, get_datetime, now
+
+from workflow_transitions.workflow_transitions.doctype.workflow_transition_rollup.workflow_transition_rollup import (
+	update_rollup,
+)
+from workflow_transitions.workflow_transitions.utils.report_cache import set_last_transition
 
 
 class StateChange(Document):
-	pass
+	def validate(self):
+		self.transition_count = max(cint(self.transition_count), len(self.items))
+
+	def on_update(self):
+		# Rows appended through the document API, e.g. by the compatibility mode Server Script.
+		# record_transition inserts its rows directly and updates the rollup and report cache itself.
+		new_transitions = get_new_transitions(self)
+		for row, previous_time in new_transitions:
+			update_rollup(self.doctype_name, row.workflow_state, row.username, row.modification_time, previous_time)
+		if new_transitions:
+			set_last_transition(self.doctype_name, new_transitions[-1][0].modification_time)
+
+
+def get_new_transitions(state_change):
+	"""The items added by the current save, each with the time its previous state began."""
+	doc_before_save = state_change.get_doc_before_save()
+	existing = {row.name for row in doc_before_save.items} if doc_before_save else set()
+
+	new_transitions = []
+	previous_time = None
+	for row in sorted(
+		(row for row in state_change.items if row.modification_time),
+		key=lambda row: get_datetime(row.modification_time),
+	):
+		if row.name not in existing:
+			new_transitions.append((row, previous_time))
+		previous_time = row.modification_time
+	return new_transitions
+
+
+def on_doctype_update():
+	frappe.db.add_index("State Change", ["doctype_name", "document_name"])
+
+
+def get_state_change_name(doctype_name, document_name):
+	return frappe.db.get_value("State Change", {"doctype_name": doctype_name, "document_name": document_name}, "name")
+
+
+def record_transition(doctype_name, document_name, workflow_state, username, role, modification_time=None):
+	"""
+	Append one State Change Items row for a document.
+	The parent is created on the first transition and the row's idx comes from the
+	parent's transition_count, so existing history is never loaded or rewritten.
+	The transition is also added to the Workflow Transition Rollup and invalidates the cached reports.
+	"""
+	parent = get_state_change_name(doctype_name, document_name)
+	if not parent:
+		state_change = frappe.new_doc("State Change")
+		state_change.doctype_name = doctype_name
+		state_change.document_name = document_name
+		state_change.insert(ignore_permissions=True)
+		parent = state_change.name
+
+	# The UPDATE locks the parent row until commit, so concurrent transitions get distinct idx values
+	frappe.db.sql(
+		"""
+		UPDATE `tabState Change`
+		SET transition_count = transition_count + 1, modified = %s, modified_by = %s
+		WHERE name = %s
+		""",
+		(now(), frappe.session.user, parent),
+	)
+	idx = frappe.db.get_value("State Change", parent, "transition_count")
+	modification_time = modification_time or now()
+	# The previous state began with the latest transition recorded so far
+	previous_time = frappe.db.sql(
+		"SELECT MAX(modification_time) FROM `tabState Change Items` WHERE parent = %s", (parent,)
+	)[0][0]
+
+	row = frappe.get_doc({
+		"doctype": "State Change Items",
+		"parent": parent,
+		"parenttype": "State Change",
+		"parentfield": "items",
+		"idx": idx,
+		"username": username,
+		"role": role,
+		"workflow_state": workflow_state,
+		"modification_time": modification_time,
+	})
+	row.db_insert()
+
+	update_rollup(doctype_name, workflow_state, username, modification_time, previous_time)
+	set_last_transition(doctype_name, modification_time)
+
+	return row
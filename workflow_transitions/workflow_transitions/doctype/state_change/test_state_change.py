@@ -1,9 +1,142 @@
 # Copyright (c) 2024, info@finbyz.tech and Contributors
 # See license.txt
 
-# import frappe
+import datetime
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from workflow_transitions.patches import set_state_change_transition_count
+from workflow_transitions.workflow_transitions.doctype.state_change.state_change import (
+	get_state_change_name,
+	record_transition,
+)
+from workflow_transitions.workflow_transitions.utils import report_cache
+
+TEST_DOCTYPE = "_Test State Change DocType"
+TEST_REPORT = "_Test Cached Report"
+TEST_REPORT_METHOD = "workflow_transitions.workflow_transitions.doctype.state_change.test_state_change.run_test_report"
+START = datetime.datetime(2026, 3, 2, 9, 0)
+
+report_runs = []
+
+
+def run_test_report(filters):
+	report_runs.append(filters)
+	return [{"fieldname": "runs"}], [{"runs": len(report_runs)}]
+
 
 class TestStateChange(FrappeTestCase):
-	pass
+	def setUp(self):
+		for name in frappe.get_all("State Change", filters={"doctype_name": TEST_DOCTYPE}, pluck="name"):
+			frappe.delete_doc("State Change", name, force=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_sequential_transitions_get_consecutive_idx(self):
+		for state in ("Draft", "Pending", "Approved", "Pending"):
+			record_transition(TEST_DOCTYPE, "DOC-1", state, "Administrator", "System Manager")
+
+		parent = get_state_change_name(TEST_DOCTYPE, "DOC-1")
+		rows = frappe.get_all(
+			"State Change Items", filters={"parent": parent}, fields=["idx", "workflow_state"], order_by="idx"
+		)
+		self.assertEqual([row.idx for row in rows], [1, 2, 3, 4])
+		self.assertEqual([row.workflow_state for row in rows], ["Draft", "Pending", "Approved", "Pending"])
+		self.assertEqual(frappe.db.get_value("State Change", parent, "transition_count"), 4)
+
+	def test_patch_seeds_transition_count_from_max_idx(self):
+		state_change = frappe.new_doc("State Change")
+		state_change.doctype_name = TEST_DOCTYPE
+		state_change.document_name = "DOC-2"
+		for state in ("Draft", "Pending", "Approved"):
+			state_change.append("items", {"workflow_state": state, "username": "Administrator"})
+		state_change.insert(ignore_permissions=True)
+
+		# History written before transition_count existed
+		frappe.db.set_value("State Change", state_change.name, "transition_count", 0, update_modified=False)
+		set_state_change_transition_count.execute()
+
+		self.assertEqual(frappe.db.get_value("State Change", state_change.name, "transition_count"), 3)
+
+		# The next transition continues after the seeded count
+		record_transition(TEST_DOCTYPE, "DOC-2", "Closed", "Administrator", "System Manager")
+		self.assertEqual(
+			frappe.db.get_value("State Change Items", {"parent": state_change.name, "workflow_state": "Closed"}, "idx"), 4
+		)
+
+
+class TestReportCache(FrappeTestCase):
+	filters = {"doctype": TEST_DOCTYPE}
+
+	def setUp(self):
+		for name in frappe.get_all("State Change", filters={"doctype_name": TEST_DOCTYPE}, pluck="name"):
+			frappe.delete_doc("State Change", name, force=True)
+		self.clear_cache()
+		report_runs.clear()
+
+	def tearDown(self):
+		frappe.db.rollback()
+		self.clear_cache()
+
+	def clear_cache(self):
+		frappe.cache.hdel(report_cache.LAST_TRANSITION_KEY, TEST_DOCTYPE)
+		frappe.cache.delete_keys(f"{report_cache.REPORT_CACHE_PREFIX}{TEST_DOCTYPE}:")
+
+	def transition(self, state, minutes):
+		record_transition(
+			TEST_DOCTYPE, "DOC-1", state, "Administrator", "System Manager",
+			START + datetime.timedelta(minutes=minutes),
+		)
+		# What frappe.db.commit runs, without committing the test data
+		frappe.db.after_commit.run()
+
+	def get_report(self):
+		return report_cache.get_cached_report(TEST_REPORT, self.filters, TEST_REPORT_METHOD)
+
+	def test_repeated_runs_hit_the_cache(self):
+		self.transition("Draft", 0)
+
+		self.assertEqual(self.get_report(), self.get_report())
+		self.assertEqual(len(report_runs), 1)
+
+	def test_new_transitions_invalidate_the_cache(self):
+		self.transition("Draft", 0)
+		self.get_report()
+
+		self.transition("Pending", 5)
+		columns, data = self.get_report()
+		self.assertEqual(len(report_runs), 2)
+		self.assertEqual(data, [{"runs": 2}])
+
+	@patch.object(frappe, "enqueue")
+	@patch.object(report_cache, "LARGE_DOCTYPE_TRANSITIONS", 1)
+	def test_large_doctypes_refresh_in_the_background(self, enqueue):
+		self.transition("Draft", 0)
+		self.transition("Pending", 5)
+
+		columns, data, message = self.get_report()
+		self.assertEqual((columns, data), ([], []))
+		self.assertIn("being prepared", message)
+		self.assertEqual(report_runs, [])
+
+		# Runs before the job finishes enqueue the same deduplicated job
+		self.get_report()
+		job_ids = {call.kwargs["job_id"] for call in enqueue.call_args_list}
+		self.assertEqual(len(job_ids), 1)
+		self.assertTrue(all(call.kwargs["deduplicate"] for call in enqueue.call_args_list))
+
+		# The background job
+		report_cache.refresh_report(TEST_REPORT, self.filters, TEST_REPORT_METHOD)
+		self.assertEqual(self.get_report(), ([{"fieldname": "runs"}], [{"runs": 1}]))
+		self.assertEqual(enqueue.call_count, 2)
+
+		# A new transition shows the previous result with a note until the job runs again
+		self.transition("Approved", 10)
+		columns, data, message = self.get_report()
+		self.assertEqual(data, [{"runs": 1}])
+		self.assertIn("Refreshing in the background", message)
+		self.assertEqual(enqueue.call_count, 3)
+		self.assertEqual(len(report_runs), 1)
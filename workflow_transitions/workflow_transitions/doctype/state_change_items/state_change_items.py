@@ -1,9 +1,14 @@
 # Copyright (c) 2024, info@finbyz.tech and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class StateChangeItems(Document):
 	pass
+
+
+def on_doctype_update():
+	# Digest builds select the transitions of a date range
+	frappe.db.add_index("State Change Items", ["modification_time"])
@@ -0,0 +1,36 @@
+# Copyright (c) 2026, info@finbyz.tech and Contributors
+# See license.txt
+
+import numpy as np
+from frappe.tests.utils import FrappeTestCase
+
+from workflow_transitions.workflow_transitions.doctype.workflow_dwell_digest.workflow_dwell_digest import (
+	build_digests,
+)
+from workflow_transitions.workflow_transitions.utils.tdigest import TDigest
+
+
+class TestWorkflowDwellDigest(FrappeTestCase):
+	def test_merged_daily_digests_match_exact_percentiles(self):
+		rng = np.random.default_rng(11)
+		durations = rng.lognormal(mean=8, sigma=1.5, size=200_000)
+		days = rng.integers(0, 30, len(durations))
+
+		daily = build_digests([("Draft", "Approved", int(day)) for day in days], durations)
+		self.assertEqual(len(daily), 30)
+
+		merged = TDigest.merge_all(daily.values())
+		self.assertEqual(merged.count, len(durations))
+
+		estimate = merged.quantile([0.5, 0.9, 0.99])
+		exact = np.quantile(durations, [0.5, 0.9, 0.99])
+		self.assertLess(np.max(np.abs(estimate / exact - 1)), 0.02)
+
+	def test_digest_round_trip(self):
+		digest = TDigest.from_values(np.arange(1, 1001, dtype=float))
+		restored = TDigest.from_dict(digest.to_dict())
+
+		self.assertEqual(restored.count, 1000)
+		self.assertAlmostEqual(restored.quantile(0.5), digest.quantile(0.5), places=2)
+		self.assertEqual(restored.quantile(0), 1)
+		self.assertEqual(restored.quantile(1), 1000)
@@ -0,0 +1,8 @@
+// Copyright (c) 2026, info@finbyz.tech and contributors
+// For license information, please see license.txt
+
+// frappe.ui.form.on("Workflow Dwell Digest", {
+// 	refresh(frm) {
+
+// 	},
+// });
@@ -0,0 +1,265 @@
+# Copyright (c) 2026, info@finbyz.tech and contributors
+# For license information, please see license.txt
+
+import json
+import time
+
+import frappe
+import numpy as np
+from frappe.model.document import Document
+from frappe.utils import add_days, get_datetime, getdate, nowdate
+
+from workflow_transitions.workflow_transitions.utils.tdigest import TDigest
+
+DWELL_QUANTILES = (0.5, 0.9, 0.99)
+
+
+class WorkflowDwellDigest(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Workflow Dwell Digest", ["doctype_name", "day"])
+
+
+def build_digests(keys, durations):
+	"""
+	Group `durations` by `keys` and return {key: TDigest}. The grouping and every digest
+	are computed with vectorized NumPy operations over the whole batch.
+	"""
+	index = {}
+	key_ids = np.fromiter((index.setdefault(key, len(index)) for key in keys), dtype=np.int64, count=len(keys))
+	durations = np.asarray(durations, dtype=float)
+	if not len(durations):
+		return {}
+
+	order = np.argsort(key_ids, kind="stable")
+	sorted_ids = key_ids[order]
+	bounds = np.flatnonzero(np.diff(sorted_ids)) + 1
+	keys_by_id = list(index)
+
+	return {
+		keys_by_id[group_ids[0]]: TDigest.from_values(values)
+		for group_ids, values in zip(np.split(sorted_ids, bounds), np.split(durations[order], bounds))
+	}
+
+
+def build_dwell_digests(from_date, to_date=None, doctype_name=None, chunk_size=500):
+	"""
+	Rebuild the per-day digests of [from_date, to_date] in one streaming pass over State Change Items.
+	Each transition contributes the time its document spent in the previous state, to the
+	(doctype, previous state, state, day of leaving) digest. Chunks of documents are folded in as they are read.
+	"""
+	from_date = getdate(from_date)
+	to_date = getdate(to_date or from_date)
+	start, end = get_datetime(from_date), get_datetime(add_days(to_date, 1))
+
+	digests = {}
+	after = ""
+	while True:
+		parents = frappe.db.sql(
+			"""
+			SELECT DISTINCT sci.parent
+			FROM `tabState Change Items` AS sci
+			JOIN `tabState Change` AS sc ON sc.name = sci.parent
+			WHERE sci.modification_time >= %(start)s AND sci.modification_time < %(end)s
+				AND sci.parent > %(after)s
+				AND (%(doctype_name)s IS NULL OR sc.doctype_name = %(doctype_name)s)
+			ORDER BY sci.parent
+			LIMIT %(chunk_size)s
+			""",
+			{"start": start, "end": end, "after": after, "doctype_name": doctype_name, "chunk_size": chunk_size},
+			pluck=True,
+		)
+		if not parents:
+			break
+
+		rows = frappe.db.sql(
+			"""
+			SELECT sc.doctype_name, t.previous_state, t.workflow_state, DATE(t.modification_time),
+				TIMESTAMPDIFF(MICROSECOND, t.previous_time, t.modification_time) / 1000000
+			FROM (
+				SELECT
+					sci.parent, sci.workflow_state, sci.modification_time,
+					LAG(sci.workflow_state) OVER w AS previous_state,
+					LAG(sci.modification_time) OVER w AS previous_time
+				FROM `tabState Change Items` AS sci
+				WHERE sci.parent IN %(parents)s
+				WINDOW w AS (PARTITION BY sci.parent ORDER BY sci.modification_time)
+			) AS t
+			JOIN `tabState Change` AS sc ON sc.name = t.parent
+			WHERE t.previous_time IS NOT NULL
+				AND t.modification_time >= %(start)s AND t.modification_time < %(end)s
+			""",
+			{"parents": tuple(parents), "start": start, "end": end},
+		)
+		if rows:
+			keys = [(row[0], row[1] or "", row[2] or "", row[3]) for row in rows]
+			for key, digest in build_digests(keys, [float(row[4]) for row in rows]).items():
+				digests[key] = digests[key].merge(digest) if key in digests else digest
+
+		after = parents[-1]
+
+	save_dwell_digests(digests, from_date, to_date, doctype_name)
+	return len(digests)
+
+
+def save_dwell_digests(digests, from_date, to_date, doctype_name=None):
+	filters = {"day": ["between", [from_date, to_date]]}
+	if doctype_name:
+		filters["doctype_name"] = doctype_name
+	frappe.db.delete("Workflow Dwell Digest", filters)
+
+	timestamp = frappe.utils.now()
+	user = frappe.session.user
+	frappe.db.bulk_insert(
+		"Workflow Dwell Digest",
+		(
+			"name", "creation", "modified", "modified_by", "owner", "docstatus",
+			"doctype_name", "workflow_state", "next_state", "day", "transition_count", "digest",
+		),
+		[
+			(
+				frappe.generate_hash(length=10), timestamp, timestamp, user, user, 0,
+				doctype, state, next_state, day, int(digest.count), json.dumps(digest.to_dict()),
+			)
+			for (doctype, state, next_state, day), digest in digests.items()
+		],
+	)
+
+
+def build_daily_dwell_digests():
+	"""Scheduler: digest yesterday's transitions."""
+	build_dwell_digests(add_days(nowdate(), -1))
+	frappe.db.commit()
+
+
+def backfill_dwell_digests(from_date=None, to_date=None, doctype_name=None, days_per_batch=30, chunk_size=500):
+	"""
+	Build the digests of existing history, from the first recorded transition up to yesterday by default.
+	Each batch of days is built in one pass and committed on its own.
+	"""
+	if not from_date:
+		from_date = frappe.db.sql(
+			"""
+			SELECT DATE(MIN(sci.modification_time))
+			FROM `tabState Change Items` AS sci
+			JOIN `tabState Change` AS sc ON sc.name = sci.parent
+			WHERE %(doctype_name)s IS NULL OR sc.doctype_name = %(doctype_name)s
+			""",
+			{"doctype_name": doctype_name},
+		)[0][0]
+		if not from_date:
+			return 0
+
+	from_date = getdate(from_date)
+	to_date = getdate(to_date or add_days(nowdate(), -1))
+
+	total = 0
+	while from_date <= to_date:
+		batch_end = min(getdate(add_days(from_date, days_per_batch - 1)), to_date)
+		total += build_dwell_digests(from_date, batch_end, doctype_name, chunk_size)
+		frappe.db.commit()
+		from_date = getdate(add_days(batch_end, 1))
+
+	return total
+
+
+def get_edge_digests(doctype_name, from_date=None, to_date=None):
+	"""Merge the stored daily digests of a date range into one digest per (state, next_state)."""
+	filters = {"doctype_name": doctype_name}
+	if from_date and to_date:
+		filters["day"] = ["between", [from_date, to_date]]
+	elif from_date:
+		filters["day"] = [">=", from_date]
+	elif to_date:
+		filters["day"] = ["<=", to_date]
+
+	grouped = {}
+	for row in frappe.get_all(
+		"Workflow Dwell Digest", filters=filters, fields=["workflow_state", "next_state", "digest"]
+	):
+		digest = row.digest if isinstance(row.digest, dict) else json.loads(row.digest)
+		grouped.setdefault((row.workflow_state, row.next_state), []).append(TDigest.from_dict(digest))
+
+	return {edge: TDigest.merge_all(digests) for edge, digests in grouped.items()}
+
+
+def summarize(digest, quantiles=DWELL_QUANTILES):
+	values = digest.quantile(list(quantiles))
+	summary = {"transition_count": int(digest.count)}
+	for q, value in zip(quantiles, values):
+		summary[f"p{round(q * 100):g}"] = round(float(value), 3)
+	return summary
+
+
+@frappe.whitelist()
+def get_dwell_percentiles(doctype_name, from_date=None, to_date=None):
+	"""
+	p50/p90/p99 seconds spent in each workflow state, overall and per (state -> next state) edge,
+	merged from the daily digests without reading State Change Items.
+	"""
+	frappe.has_permission("Workflow Dwell Digest", "read", throw=True)
+
+	edges = get_edge_digests(doctype_name, from_date, to_date)
+
+	by_state = {}
+	for (state, _), digest in edges.items():
+		by_state.setdefault(state, []).append(digest)
+
+	return {
+		"states": [
+			{"workflow_state": state, **summarize(TDigest.merge_all(digests))}
+			for state, digests in sorted(by_state.items())
+		],
+		"edges": [
+			{"workflow_state": state, "next_state": next_state, **summarize(digest)}
+			for (state, next_state), digest in sorted(edges.items())
+		],
+	}
+
+
+def benchmark(transitions=3_000_000, days=90, edges=12, seed=7):
+	"""
+	Time the digest pipeline on synthetic transitions: grouping and digesting in day-sized batches,
+	merging every day of every edge, and reading the percentiles. Reports the relative error
+	against exact NumPy percentiles. Run with `bench --site <site> execute` on this function.
+	"""
+	rng = np.random.default_rng(seed)
+	edge_ids = rng.integers(0, edges, transitions)
+	day_ids = np.sort(rng.integers(0, days, transitions))
+	# Long-tailed approval times: minutes for most edges, days for a few
+	durations = rng.lognormal(mean=7 + edge_ids % 4, sigma=1.2, size=transitions)
+
+	started = time.perf_counter()
+	daily = {}
+	bounds = np.flatnonzero(np.diff(day_ids)) + 1
+	for days_chunk, edge_chunk, duration_chunk in zip(
+		np.split(day_ids, bounds), np.split(edge_ids, bounds), np.split(durations, bounds)
+	):
+		keys = list(zip(edge_chunk.tolist(), days_chunk.tolist()))
+		daily.update(build_digests(keys, duration_chunk))
+	build_seconds = time.perf_counter() - started
+
+	started = time.perf_counter()
+	merged = {}
+	for (edge, _), digest in daily.items():
+		merged.setdefault(edge, []).append(digest)
+	merged = {edge: TDigest.merge_all(digests) for edge, digests in merged.items()}
+	estimates = {edge: digest.quantile(list(DWELL_QUANTILES)) for edge, digest in merged.items()}
+	merge_seconds = time.perf_counter() - started
+
+	max_error = 0.0
+	for edge, estimate in estimates.items():
+		exact = np.quantile(durations[edge_ids == edge], DWELL_QUANTILES)
+		max_error = max(max_error, float(np.max(np.abs(estimate / exact - 1))))
+
+	result = {
+		"transitions": transitions,
+		"digests": len(daily),
+		"build_seconds": round(build_seconds, 3),
+		"merge_and_query_seconds": round(merge_seconds, 3),
+		"transitions_per_second": round(transitions / build_seconds),
+		"max_relative_error": round(max_error, 5),
+	}
+	return result
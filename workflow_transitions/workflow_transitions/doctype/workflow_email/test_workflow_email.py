@@ -1,9 +1,290 @@
 # Copyright (c) 2026, info@finbyz.tech and Contributors
 # See license.txt
 
-# import frappe
+import socket
+import unittest
+from unittest.mock import patch
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from workflow_transitions.workflow_transitions.doctype.state_change.state_change import record_transition
+from workflow_transitions.workflow_transitions.doctype.workflow_email.workflow_email import queue_workflow_email
+from workflow_transitions.workflow_transitions.utils.delivery import (
+	SMTPPool,
+	deliver,
+	record_sent_mail,
+	send_pooled_mail,
+)
+from workflow_transitions.workflow_transitions.utils.email_rules import clear_email_rules, get_email_rules
+from workflow_transitions.workflow_transitions.utils.roles import clear_role_users, get_role_users
+
+try:
+	from aiosmtpd.controller import Controller
+except ImportError:
+	Controller = None
+
+
+class RecordingHandler:
+	def __init__(self):
+		self.envelopes = []
+
+	async def handle_DATA(self, server, session, envelope):
+		self.envelopes.append(envelope)
+		return "250 OK"
+
+
+def get_free_port():
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+class CountingPool(SMTPPool):
+	connections = 0
+
+	def connect(self):
+		self.connections += 1
+		return super().connect()
+
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class TestWorkflowEmailDelivery(FrappeTestCase):
+	def setUp(self):
+		self.handler = RecordingHandler()
+		self.port = get_free_port()
+		self.controller = Controller(self.handler, hostname="127.0.0.1", port=self.port)
+		self.controller.start()
+
+	def tearDown(self):
+		self.controller.stop()
+
+	def test_pooled_delivery(self):
+		pool = CountingPool("127.0.0.1", self.port, size=3)
+		messages = [
+			("sender@example.com", f"user{i}@example.com", f"Subject: Test {i}\r\n\r\nBody {i}")
+			for i in range(20)
+		]
+
+		stats = deliver(messages, pool)
+		pool.close()
+
+		self.assertEqual(stats.sent, 20)
+		self.assertEqual(stats.failed, [])
+		self.assertEqual(
+			sorted(envelope.rcpt_tos[0] for envelope in self.handler.envelopes),
+			sorted(recipient for _, recipient, _ in messages),
+		)
+		# Sessions are reused instead of opened per message
+		self.assertLessEqual(pool.connections, 3)
+
+	def test_failed_recipients_are_reported(self):
+		# A port nothing listens on
+		pool = SMTPPool("127.0.0.1", get_free_port(), size=2)
+		stats = deliver([("sender@example.com", "user@example.com", "Subject: Test\r\n\r\nBody")], pool, retries=1, backoff=0)
+
+		self.assertEqual(stats.sent, 0)
+		self.assertEqual(stats.failed, ["user@example.com"])
+
+	def test_unencodable_messages_release_their_session(self):
+		pool = CountingPool("127.0.0.1", self.port, size=2)
+		# str bodies are sent as ASCII, so this raises UnicodeEncodeError inside sendmail
+		messages = [("sender@example.com", f"user{i}@example.com", "Subject: Test\r\n\r\nCafé") for i in range(5)]
+
+		stats = deliver(messages, pool, backoff=0)
+		self.assertEqual(stats.sent, 0)
+		self.assertEqual(len(stats.failed), 5)
+
+		# Every slot was given back, so later sends do not block
+		stats = deliver([("sender@example.com", "user@example.com", "Subject: Test\r\n\r\nBody")], pool)
+		pool.close()
+		self.assertEqual(stats.sent, 1)
+
+	@patch.object(frappe, "sendmail")
+	def test_muted_emails_skip_the_pool(self, sendmail):
+		email_account = frappe._dict(
+			name="_Test Pooled Account",
+			modified="0",
+			email_id="sender@example.com",
+			default_sender="sender@example.com",
+			smtp_server="127.0.0.1",
+			smtp_port=self.port,
+			no_smtp_authentication=1,
+		)
+		with patch("frappe.email.smtp.get_outgoing_email_account", return_value=email_account), patch.dict(
+			frappe.flags, {"mute_emails": True}
+		):
+			send_pooled_mail(["user@example.com"], "Muted", "Body")
+
+		self.assertEqual(self.handler.envelopes, [])
+		sendmail.assert_called_once()
+		self.assertEqual(sendmail.call_args.kwargs["recipients"], ["user@example.com"])
+
+
+class TestSentMailRecord(FrappeTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_each_recipient_keeps_its_own_copy(self):
+		email_account = frappe._dict(name=None, default_sender="sender@example.com")
+		messages = [
+			("sender@example.com", f"user{i}@example.com", f"To: user{i}@example.com\r\n\r\nBody")
+			for i in range(2)
+		]
+		record_sent_mail(email_account, messages, "ToDo", "_Test Sent Mail")
+
+		queued = frappe.get_all(
+			"Email Queue",
+			filters={"reference_doctype": "ToDo", "reference_name": "_Test Sent Mail"},
+			pluck="name",
+		)
+		self.assertEqual(len(queued), 2)
+		for name in queued:
+			email_queue = frappe.get_doc("Email Queue", name)
+			self.assertEqual(email_queue.status, "Sent")
+			self.assertEqual(len(email_queue.recipients), 1)
+			self.assertIn(f"To: {email_queue.recipients[0].recipient}", email_queue.message)
+
+
+TEST_STATE = "_Test Workflow Email State"
+TEST_ROLE = "_Test Workflow Email Role"
+TEST_USER = "_test_workflow_email_role@example.com"
+
+
+class TestWorkflowEmailRules(FrappeTestCase):
+	def setUp(self):
+		if not frappe.db.exists("Workflow State", TEST_STATE):
+			frappe.get_doc({"doctype": "Workflow State", "workflow_state_name": TEST_STATE}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		# The indexes live in Redis, which the rollback does not undo
+		clear_email_rules()
+
+	def get_rule_emails(self):
+		return [rule.workflow_email for rule in get_email_rules("ToDo", TEST_STATE)]
+
+	def test_new_and_disabled_rules_apply_on_the_next_save(self):
+		# Build and cache the index before the rule exists
+		self.assertEqual(self.get_rule_emails(), [])
+
+		workflow_email = frappe.get_doc({
+			"doctype": "Workflow Email",
+			"document_type": "ToDo",
+			"based_on": "User ID",
+			"message": "{{ doc.name }}",
+			"is_active": 1,
+			"enable_email_notifications": 1,
+			"workflows": [{
+				"workflow_state": TEST_STATE,
+				"conditional_doctype": "User",
+				"document_no": "Administrator",
+				"user": "rule@example.com",
+			}],
+		}).insert(ignore_permissions=True)
+
+		rules = get_email_rules("ToDo", TEST_STATE)
+		self.assertEqual([rule.workflow_email for rule in rules], [workflow_email.name])
+		self.assertIn("rule@example.com", rules[0].recipients)
+
+		workflow_email.enable_email_notifications = 0
+		workflow_email.save(ignore_permissions=True)
+		self.assertEqual(self.get_rule_emails(), [])
+
+
+class TestWorkflowEmailQueue(FrappeTestCase):
+	docname = "_Test Workflow Email Queue"
+
+	def tearDown(self):
+		frappe.db.rollback()
+		frappe.cache.delete_keys("workflow_transitions:debounce:")
+
+	def transition(self):
+		record_transition("ToDo", self.docname, TEST_STATE, "Administrator", "System Manager")
+
+	def save(self):
+		queue_workflow_email("_Test Rule", TEST_STATE, "ToDo", self.docname, ["queue@example.com"])
+
+	def commit(self):
+		# What frappe.db.commit runs, without committing the test data
+		frappe.db.after_commit.run()
+
+	@patch.object(frappe, "enqueue")
+	def test_saves_within_one_transition_enqueue_once(self, enqueue):
+		self.transition()
+		self.save()
+		self.save()
+		self.commit()
+
+		self.assertEqual(enqueue.call_count, 1)
+		self.assertTrue(enqueue.call_args.kwargs["deduplicate"])
+
+		# A later save of the same transition is debounced as well
+		self.save()
+		self.commit()
+		self.assertEqual(enqueue.call_count, 1)
+
+	@patch.object(frappe, "enqueue")
+	def test_separate_transitions_enqueue_twice(self, enqueue):
+		self.transition()
+		self.save()
+		self.commit()
+
+		self.transition()
+		self.save()
+		self.commit()
+
+		self.assertEqual(enqueue.call_count, 2)
+		first, second = (call.kwargs["job_id"] for call in enqueue.call_args_list)
+		self.assertNotEqual(first, second)
+
+	@patch.object(frappe, "enqueue")
+	def test_rolled_back_saves_do_not_enqueue(self, enqueue):
+		self.transition()
+		self.save()
+		frappe.db.rollback()
+		self.commit()
+
+		enqueue.assert_not_called()
+
+
+class TestRoleUsers(FrappeTestCase):
+	def setUp(self):
+		if not frappe.db.exists("Role", TEST_ROLE):
+			frappe.get_doc({"doctype": "Role", "role_name": TEST_ROLE, "desk_access": 1}).insert(ignore_permissions=True)
+		if frappe.db.exists("User", TEST_USER):
+			self.user = frappe.get_doc("User", TEST_USER)
+		else:
+			self.user = frappe.get_doc({
+				"doctype": "User",
+				"email": TEST_USER,
+				"first_name": "Role Index",
+				"send_welcome_email": 0,
+			}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+		clear_role_users()
+
+	def get_members(self):
+		return [user.user for user in get_role_users([TEST_ROLE])]
+
+	def test_added_and_removed_roles_apply_on_the_next_save(self):
+		self.user.remove_roles(TEST_ROLE)
+		# Build and cache the index without the user
+		self.assertNotIn(TEST_USER, self.get_members())
+
+		self.user.add_roles(TEST_ROLE)
+		self.assertIn(TEST_USER, self.get_members())
+
+		self.user.remove_roles(TEST_ROLE)
+		self.assertNotIn(TEST_USER, self.get_members())
+
+	def test_disabled_users_leave_the_index(self):
+		self.user.add_roles(TEST_ROLE)
+		self.assertIn(TEST_USER, self.get_members())
 
-class TestWorkflowEmail(FrappeTestCase):
-	pass
+		self.user.reload()
+		self.user.enabled = 0
+		self.user.save(ignore_permissions=True)
+		self.assertNotIn(TEST_USER, self.get_members())
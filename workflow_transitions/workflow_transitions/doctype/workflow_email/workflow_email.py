@@ -1,22 +1,41 @@
-
-
 # Copyright (c) 2026, info@finbyz.tech and contributors
 # For license information, please see license.txt
 
+import hashlib
+
 import frappe
 from frappe.model.document import Document
 
+from workflow_transitions.workflow_transitions.utils.delivery import send_pooled_mail
+from workflow_transitions.workflow_transitions.utils.email_rules import clear_email_rules, get_email_rules
+from workflow_transitions.workflow_transitions.utils.email_templates import clear_message_template, render_message
+from workflow_transitions.workflow_transitions.utils.pdf_cache import get_pdf
+from workflow_transitions.workflow_transitions.utils.roles import get_recipient_emails
+from workflow_transitions.workflow_transitions.utils.transition_config import (
+	clear_transition_config,
+	is_compatibility_mode,
+)
+
 
 class WorkflowEmail(Document):
 	def before_validate(self):
 		self.before_validate_workflow_email()
 
+	def on_update(self):
+		clear_transition_config()
+		clear_email_rules()
+
+	def on_trash(self):
+		clear_transition_config()
+		clear_email_rules()
+		clear_message_template(self.name)
+
 	def before_validate_workflow_email(self):
 		"""
-		Generic approach to create server scripts for workflow email notifications
-		Similar to workflow transitions server script generation
+		Emails are triggered in-app by the doc_events dispatcher. The Server Script is
+		only generated when the doctype's Workflow uses the Server Script compatibility mode.
 		"""
-		if self.is_active and self.enable_email_notifications:
+		if self.is_active and self.enable_email_notifications and is_compatibility_mode(self.document_type):
 			# Delete existing server scripts if they exist
 			server_script_names = [
 				f"Workflow Email Trigger for {self.document_type}",
@@ -31,12 +50,49 @@ class WorkflowEmail(Document):
 			
 			frappe.msgprint(f"Workflow Email notifications enabled for {self.document_type}")
 		
-		elif self.is_active and not self.enable_email_notifications:
-			# Remove server scripts when email notifications are disabled
+		elif self.is_active:
+			# Remove the server script when it is not needed
 			if frappe.db.exists("Server Script", f"Workflow Email Trigger for {self.document_type}"):
 				frappe.delete_doc("Server Script", f"Workflow Email Trigger for {self.document_type}")
 			
-			frappe.msgprint(f"Workflow Email notifications disabled for {self.document_type}")
+			if self.enable_email_notifications:
+				frappe.msgprint(f"Workflow Email notifications enabled for {self.document_type}")
+			else:
+				frappe.msgprint(f"Workflow Email notifications disabled for {self.document_type}")
+
+
+def trigger_workflow_emails(doc, old_state, new_state):
+	"""
+	Queue the Workflow Email rules of `doc.doctype` that match the state `doc` moved into.
+	Called from the doc_events dispatcher after save with the detected state transition.
+	"""
+	if not new_state or old_state == new_state:
+		return
+
+	for rule in get_email_rules(doc.doctype, new_state):
+		# Conditional check
+		if rule.conditional_field and doc.get(rule.conditional_field) != rule.document_no:
+			continue
+
+		recipients = get_workflow_email_recipients(rule, doc, new_state)
+		if not recipients:
+			continue
+
+		try:
+			queue_workflow_email(rule.workflow_email, rule.workflow_state, doc.doctype, doc.name, recipients)
+		except Exception:
+			frappe.log_error(title="Workflow Email Queue Error")
+
+
+def get_workflow_email_recipients(rule, doc, new_state):
+	users = list(rule.recipients)
+
+	# Add document creator email if state is Approved
+	if new_state == "Approved":
+		users.append(doc.owner)
+
+	# Role holders, explicit addresses and the creator, deduplicated
+	return get_recipient_emails(rule.roles, users)
 
 
 def create_workflow_email_trigger_script(workflow_email_doc):
@@ -251,24 +307,66 @@ else:
 	return script
 
 
-@frappe.whitelist(allow_guest=True)
+# Seconds during which repeated sends of the same rule and transition collapse into one
+WORKFLOW_EMAIL_DEBOUNCE = 60
+
+
+@frappe.whitelist()
 def enqueue_workflow_email(workflow_email, workflow, doc, recipients):
 	"""
 	Enqueue email sending to background job to prevent request timeout
 	This function is called from the server script
 	"""
-	frappe.enqueue(
-		method=send_email,
-		queue="short",
-		is_async=True,
-		timeout=300,
-		workflow_email_name=workflow_email.name,
-		workflow_state=workflow.get("workflow_state"),
-		doctype=doc.doctype,
-		docname=doc.name,
-		recipients=recipients
-	)
-	frappe.logger().info(f"Enqueued workflow email for {doc.doctype} {doc.name} to {len(recipients)} recipients")
+	queue_workflow_email(workflow_email.name, workflow.get("workflow_state"), doc.doctype, doc.name, recipients)
+
+
+def queue_workflow_email(workflow_email_name, workflow_state, doctype, docname, recipients):
+	"""
+	Enqueue one `send_email` job per (rule, document, transition) once the save is committed.
+	The job id is deterministic so an already queued send is not duplicated, and a debounce key
+	drops repeats of the same transition within WORKFLOW_EMAIL_DEBOUNCE seconds. Only names are
+	passed to the job, it reloads the rest.
+	"""
+	transition = get_transition_id(doctype, docname)
+	job_id = get_workflow_email_job_id(workflow_email_name, doctype, docname, workflow_state, transition)
+	recipients = list(recipients)
+
+	def enqueue():
+		# SET NX: only the first caller in the window gets to enqueue
+		if not frappe.cache.set(frappe.cache.make_key(f"workflow_transitions:debounce:{job_id}"), 1, nx=True, ex=WORKFLOW_EMAIL_DEBOUNCE):
+			frappe.logger().info(f"Skipped duplicate workflow email for {doctype} {docname} ({workflow_state})")
+			return
+
+		frappe.enqueue(
+			method=send_email,
+			queue="short",
+			timeout=300,
+			job_id=job_id,
+			deduplicate=True,
+			workflow_email_name=workflow_email_name,
+			workflow_state=workflow_state,
+			doctype=doctype,
+			docname=docname,
+			recipients=recipients
+		)
+		frappe.logger().info(f"Enqueued workflow email for {doctype} {docname} to {len(recipients)} recipients")
+
+	# A rolled back save neither sends nor holds the debounce key
+	frappe.db.after_commit.add(enqueue)
+
+
+def get_transition_id(doctype, docname):
+	"""
+	Identify the transition being saved: its idx in the State Change history, or the document's
+	`modified` when transitions of the doctype are not tracked.
+	"""
+	idx = frappe.db.get_value("State Change", {"doctype_name": doctype, "document_name": docname}, "transition_count")
+	return f"idx:{idx}" if idx else f"modified:{frappe.db.get_value(doctype, docname, 'modified')}"
+
+
+def get_workflow_email_job_id(workflow_email_name, doctype, docname, workflow_state, transition=None):
+	key = "\0".join((workflow_email_name, doctype, docname, workflow_state or "", transition or ""))
+	return f"workflow_email::{hashlib.sha1(key.encode()).hexdigest()}"
 
 
 def send_email(workflow_email_name, workflow_state, doctype, docname, recipients):
@@ -297,10 +395,8 @@ def send_email(workflow_email_name, workflow_state, doctype, docname, recipients
 
 	# Render message template with doc context
 	try:
-		if not workflow_email.message:
-			frappe.throw("Email message template is empty")
-			
-		message = frappe.render_template(workflow_email.message, {"doc": doc})
+		# Compiled once per Workflow Email version and shared across jobs
+		message = render_message(workflow_email, doc)
 		frappe.logger().debug(f"✓ Message rendered successfully. Length: {len(message)}")
 	except Exception as e:
 		# frappe.log_error(
@@ -314,12 +410,8 @@ def send_email(workflow_email_name, workflow_state, doctype, docname, recipients
 	if workflow_email.attach_print_format:
 		frappe.logger().debug(f"Generating PDF with print format: {workflow_email.attach_print_format}")
 		try:
-			pdf = frappe.get_print(
-				doc.doctype,
-				doc.name,
-				workflow_email.attach_print_format,
-				as_pdf=True
-			)
+			# Shared by every rule and recipient group sending this version of the document
+			pdf = get_pdf(doc, workflow_email.attach_print_format)
 			attachments.append({
 				"fname": f"{doc.name}.pdf",
 				"fcontent": pdf
@@ -333,15 +425,14 @@ def send_email(workflow_email_name, workflow_state, doctype, docname, recipients
 			frappe.logger().info(f"Error generating PDF: {str(e)}")
 
 	try:
-		frappe.sendmail(
-			recipients=recipients,
-			subject=subject,
-			message=message,
+		# Sent over pooled SMTP sessions, failures fall back to the Email Queue
+		send_pooled_mail(
+			recipients,
+			subject,
+			message,
 			attachments=attachments,
 			reference_doctype=doc.doctype,
 			reference_name=doc.name,
-			now=True
-			# Email will be queued and sent by email queue worker
 		)
 		
 		
@@ -1,9 +1,154 @@
 # Copyright (c) 2025, info@finbyz.tech and Contributors
 # See license.txt
 
-# import frappe
+import datetime
+import random
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
 
+from workflow_transitions.workflow_transitions.doc_events.document import create_workflow_reminder
+from workflow_transitions.workflow_transitions.doctype.workflow_reminder.workflow_reminder import (
+	calculate_target_datetime,
+	cancel_reminders,
+)
+
+
+def walk_target_datetime(from_time, total_shift_hours, start_time, end_time, break_start_time, break_end_time, holidays):
+	"""The original day-by-day walk, kept as the reference for calculate_target_datetime."""
+	if total_shift_hours <= 0:
+		return from_time
+
+	total_required = datetime.timedelta(hours=total_shift_hours)
+	total_counted = datetime.timedelta()
+	current_time = from_time
+
+	while total_counted < total_required:
+		current_date = current_time.date()
+		next_day = datetime.datetime.combine(current_date + datetime.timedelta(days=1), start_time)
+
+		if current_date in holidays:
+			current_time = next_day
+			continue
+
+		shift_start = datetime.datetime.combine(current_date, start_time)
+		shift_end = datetime.datetime.combine(current_date, end_time)
+		break_start = datetime.datetime.combine(current_date, break_start_time)
+		break_end = datetime.datetime.combine(current_date, break_end_time)
+
+		if current_time < shift_start:
+			current_time = shift_start
+
+		if current_time >= shift_end:
+			current_time = next_day
+			continue
+
+		work_end = min(shift_end, break_start)
+		if current_time < work_end:
+			available = work_end - current_time
+			if total_counted + available >= total_required:
+				return current_time + (total_required - total_counted)
+			total_counted += available
+			current_time = break_end
+			continue
+
+		if break_end <= current_time < shift_end:
+			available = shift_end - current_time
+			if total_counted + available >= total_required:
+				return current_time + (total_required - total_counted)
+			total_counted += available
+			current_time = next_day
+			continue
+
+		if break_start <= current_time < break_end:
+			current_time = break_end
+			continue
+
+		current_time = next_day
+
+	return current_time
+
 
 class TestWorkflowReminder(FrappeTestCase):
-	pass
+	def test_target_datetime_matches_day_walk(self):
+		rng = random.Random(20251018)
+		base = datetime.datetime(2025, 1, 1)
+
+		for _ in range(2000):
+			start, break_start, break_end, end = sorted(rng.sample(range(0, 24 * 4), 4))
+			shift = [datetime.time(q // 4, (q % 4) * 15) for q in (start, end, break_start, break_end)]
+			holidays = {
+				(base + datetime.timedelta(days=day)).date()
+				for day in rng.sample(range(0, 400), rng.randint(0, 150))
+			}
+			from_time = base + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 30), seconds=rng.randint(0, 59))
+			hours = rng.choice([0, rng.uniform(0.01, 8), rng.uniform(8, 400)])
+
+			self.assertEqual(
+				calculate_target_datetime(from_time, hours, *shift, holidays=holidays),
+				walk_target_datetime(from_time, hours, *shift, holidays),
+				msg=f"{from_time} {hours} {shift}",
+			)
+
+	def test_holidays_are_skipped(self):
+		shift = [datetime.time(9), datetime.time(18), datetime.time(13), datetime.time(14)]
+		holidays = {datetime.date(2025, 1, 2), datetime.date(2025, 1, 3)}
+
+		# 8 working hours a day: Jan 1 afternoon uses 4, the remaining 12 land on Jan 4 and Jan 5
+		self.assertEqual(
+			calculate_target_datetime(datetime.datetime(2025, 1, 1, 14), 16, *shift, holidays=holidays),
+			datetime.datetime(2025, 1, 5, 13),
+		)
+
+
+class TestWorkflowReminderStates(FrappeTestCase):
+	def setUp(self):
+		if not frappe.db.exists("Document Shift", "ToDo"):
+			frappe.get_doc({
+				"doctype": "Document Shift",
+				"doctype_name": "ToDo",
+				"start_time": "09:00:00",
+				"end_time": "18:00:00",
+				"break_start_time": "13:00:00",
+				"break_end_time": "14:00:00",
+				"overdue_time": 8,
+				"shift_details": [{"total_time": 4}],
+			}).insert(ignore_permissions=True)
+		self.todo = frappe.get_doc({"doctype": "ToDo", "description": "Workflow reminder test"}).insert(ignore_permissions=True)
+
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def move_to(self, state):
+		"""What the doc_events dispatcher does when the document enters `state`."""
+		cancel_reminders("ToDo", self.todo.name, state)
+		create_workflow_reminder(frappe._dict(doctype="ToDo", name=self.todo.name, workflow_state=state))
+
+	def get_reminders(self, state):
+		return frappe.get_all(
+			"Workflow Reminder",
+			filters={"doctype_name": "ToDo", "document_name": self.todo.name, "workflow_state": state},
+			fields=["name", "cancelled"],
+		)
+
+	def test_returning_to_a_state_creates_a_new_reminder(self):
+		self.move_to("Pending")
+		self.move_to("Rework")
+		self.move_to("Pending")
+
+		reminders = self.get_reminders("Pending")
+		self.assertEqual(len(reminders), 2)
+		self.assertEqual(sorted(reminder.cancelled for reminder in reminders), [0, 1])
+		self.assertEqual([reminder.cancelled for reminder in self.get_reminders("Rework")], [1])
+
+	def test_returning_after_the_reminder_was_sent(self):
+		self.move_to("Pending")
+		sent = self.get_reminders("Pending")[0].name
+		frappe.db.set_value("Workflow Reminder", sent, {"notification_send": 1, "overdue_notification_send": 1})
+
+		self.move_to("Rework")
+		self.move_to("Pending")
+
+		pending = [reminder.name for reminder in self.get_reminders("Pending") if not reminder.cancelled]
+		self.assertEqual(len(pending), 1)
+		self.assertNotEqual(pending[0], sent)
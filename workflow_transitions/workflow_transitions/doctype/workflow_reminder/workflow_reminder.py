@@ -4,139 +4,172 @@
 import frappe
 from frappe.model.document import Document
 from frappe.email.doctype.notification.notification import get_context
+import bisect
 import datetime
+import pickle
 from frappe.utils import now_datetime
+from workflow_transitions.workflow_transitions.utils.conditions import evaluate_condition
+from workflow_transitions.workflow_transitions.utils.notifications import fan_out, insert_notification_logs
+from workflow_transitions.workflow_transitions.utils.roles import get_role_users
+from workflow_transitions.workflow_transitions.utils.workflow_graph import get_workflow_graph
+
+# doctype -> Document Shift config, reused until the Document Shift is modified
+_local_shifts = {}
 
 class WorkflowReminder(Document):
     def validate(self):
-        data = frappe.get_doc("Document Shift", self.doctype_name)
-        
-        # Default total shift time
-        self.total_shift_time = 0
-
-        # Evaluate conditions inside Document Shift child table
-        for row in data.shift_details:
-            context = get_context(frappe.get_doc(self.doctype_name, self.document_name))
-            if not row.condition:
-                self.total_shift_time = row.total_time
-            else:
-                condition_result = frappe.safe_eval(row.condition, None, context)
-                if condition_result:
-                    self.total_shift_time = row.total_time  # Assuming row.total_time is in hours
-        if data.overdue_time:
-            self.overdue_shift_time = data.overdue_time
-        if data.role:
-            self.role = data.role
+        plan = plan_reminder(self.doctype_name, self.document_name)
+
+        self.total_shift_time = plan.total_shift_time
+        if plan.overdue_shift_time:
+            self.overdue_shift_time = plan.overdue_shift_time
+        if plan.role:
+            self.role = plan.role
 
         # Ensure required fields are available
         if not self.time or not self.total_shift_time:
             frappe.throw("Missing 'time' or 'total_shift_time' for Workflow Reminder calculation")
 
-        from_time = self.time
-        total_shift_hours = self.total_shift_time
-        start_time = convert_to_time(data.start_time)
-        end_time = convert_to_time(data.end_time)
-        break_start_time = convert_to_time(data.break_start_time)
-        break_end_time = convert_to_time(data.break_end_time)
+        # Both target times share one holiday lookup
+        holidays = HolidayCalendar(frappe.utils.get_datetime(self.time).date())
 
         # Calculate the target datetime
         target_time = calculate_target_datetime(
-            from_time, total_shift_hours, start_time, end_time, break_start_time, break_end_time
+            self.time, self.total_shift_time, *plan.shift, holidays=holidays
         )
         overdue_time = calculate_target_datetime(
-            from_time, self.overdue_shift_time, start_time, end_time, break_start_time, break_end_time
+            self.time, self.overdue_shift_time, *plan.shift, holidays=holidays
         )
         # Store the calculated target time
         self.notification_send_time = target_time
         self.overdue_time = overdue_time
 
+    def on_update(self):
+        if not self.cancelled:
+            due = self.notification_send_time if not self.notification_send else self.overdue_time
+            # A tick running before the commit would not see this reminder yet
+            frappe.db.after_commit.add(lambda: schedule_next_due(due))
+
                 
 def send_reminder(data):
     try:
-        # Fetch Active Workflow
-        workflow = frappe.get_value("Workflow", {"document_type": data.doctype_name, "is_active": 1}, "name")
-        if not workflow:
-            frappe.log_error("Active Workflow not found", "Workflow Reminder")
-            return
+        if data.notification_send:
+            return  # Already sent
 
-        workflow_doc = frappe.get_doc("Workflow", workflow)
-        current_state = data.workflow_state
-        next_roles = set()
-
-        # Loop through transitions and find eligible next state(s) from current_state
-        for transition in workflow_doc.transitions:
-            if transition.state == current_state:
-                # Check condition if exists
-                if transition.condition:
-                    if not frappe.safe_eval(transition.condition, {"doc": frappe.get_doc(data.doctype_name, data.document_name)}):
-                        continue  # Skip this transition if condition fails
-                # If condition passed or not required, add role to notify
-                if transition.allowed:
-                    next_roles.add(transition.allowed)
-
-        if not next_roles:
-            frappe.log_error(f"No valid next role found from state '{current_state}'", "Workflow Reminder")
+        user_list = get_reminder_recipients(data)
+        if not user_list:
             return
 
-        # Fetch users based on the role(s)
-        users = frappe.get_all("Has Role", 
-            filters={"role": ["in", list(next_roles)]}, 
-            fields=["parent"])  # 'parent' is the user
-        
-        user_list = []
-        doctype_data = frappe.get_doc(data.doctype_name, data.document_name)
-        
-        for row in users:
-            user_id = row.parent  # Get actual user ID string
-            if frappe.db.exists("User", user_id) and user_id != "Administrator":
-                if frappe.db.get_value("Workflow", {"document_type": data.doctype_name, "is_active": 1}, "send_email_as_project_condition") == 1:
-                    if check_project_permissions(user_id, doctype_data):
-                        user_list.append(user_id)
-                else:
+        # Create Notification Logs and send the emails in batches
+        doc_url = f"{frappe.utils.get_url()}/app/{frappe.scrub(data.doctype_name)}/{data.document_name}"
+        email_body = f"""
+        Dear User,<br><br>
+        This is a reminder to take action on document <a href="{doc_url}"><b>{data.document_name}</b></a>  ({data.doctype_name}).<br>
+        Current Workflow Stage: **{data.workflow_state}**<br>
+        Please review and proceed as per the workflow process.<br>
+        """
+        fan_out(
+            user_list,
+            data.doctype_name,
+            data.document_name,
+            subject=data.description or f"Reminder for {data.document_name}",
+            email_subject="Workflow Reminder Alert",
+            email_body=email_body,
+        )
+
+    except Exception as e:
+        frappe.log_error(f"Failed to send reminder: {str(e)}", "Workflow Reminder")
+
+def get_reminder_recipients(data):
+    """Users who can move the reminder's document out of its current workflow state."""
+    # Fetch Active Workflow
+    graph = get_workflow_graph(data.doctype_name)
+    if not graph:
+        frappe.log_error("Active Workflow not found", "Workflow Reminder")
+        return []
+
+    current_state = data.workflow_state
+    doctype_data = frappe.get_doc(data.doctype_name, data.document_name)
+
+    # Find eligible next state(s) from current_state whose condition passes
+    next_roles = graph.get_next_roles(current_state, doctype_data)
+
+    if not next_roles:
+        frappe.log_error(f"No valid next role found from state '{current_state}'", "Workflow Reminder")
+        return []
+
+    # Fetch users based on the role(s)
+    users = get_role_users(next_roles)
+
+    user_list = []
+
+    for row in users:
+        user_id = row.user
+        if user_id != "Administrator":
+            if graph.send_email_as_project_condition == 1:
+                if check_project_permissions(user_id, doctype_data):
                     user_list.append(user_id)
-        
-        if not user_list:
-            frappe.log_error(f"No users found for roles: {next_roles}", "Workflow Reminder")
-            user_list = [row.parent for row in users]
+            else:
+                user_list.append(user_id)
+
+    if not user_list:
+        frappe.log_error(f"No users found for roles: {next_roles}", "Workflow Reminder")
+        user_list = [row.user for row in users]
+
+    return user_list
+
+def get_document_shift(doctype_name):
+    """Return the shift configuration of `doctype_name`, cached in process memory by its `modified` timestamp."""
+    modified = frappe.db.get_value("Document Shift", doctype_name, "modified")
+    if not modified:
+        frappe.throw(f"Document Shift not found for {doctype_name}", frappe.DoesNotExistError)
+
+    shift = _local_shifts.get(doctype_name)
+    if shift and shift.modified == modified:
+        return shift
+
+    data = frappe.get_doc("Document Shift", doctype_name)
+    shift = _local_shifts[doctype_name] = frappe._dict(
+        modified=modified,
+        shift=(
+            convert_to_time(data.start_time),
+            convert_to_time(data.end_time),
+            convert_to_time(data.break_start_time),
+            convert_to_time(data.break_end_time),
+        ),
+        shift_details=[(row.condition, row.total_time) for row in data.shift_details],
+        overdue_time=data.overdue_time,
+        role=data.role,
+    )
+    return shift
+
+def plan_reminder(doctype_name, document_name):
+    """Pick the shift time, overdue time and role of a reminder for one document.
+
+    The target document is loaded and its context built once for all Shift Detail rows;
+    as before, the last row whose condition holds (or that has none) wins.
+    """
+    shift = get_document_shift(doctype_name)
+
+    context = None
+    total_shift_time = 0
+    for condition, total_time in shift.shift_details:
+        if not condition:
+            total_shift_time = total_time
+            continue
 
-        if data.notification_send:
-            return  # Already sent
+        if context is None:
+            context = get_context(frappe.get_doc(doctype_name, document_name))
+        if evaluate_condition(condition, None, context):
+            total_shift_time = total_time  # Assuming row.total_time is in hours
 
-        # Create Notification Logs and (Optional) Send Emails
-        user_list = list(set(user_list))
-        print(user_list)
-        for user in user_list:
-            if not user:
-                continue  # Skip this user if no email is found
-
-            # Create notification log
-            notification = frappe.new_doc("Notification Log")
-            notification.for_user = user  # Directly assign the user ID string
-            notification.type = "Alert"
-            notification.document_type = data.doctype_name
-            notification.document_name = data.document_name
-            notification.subject = data.description or f"Reminder for {data.document_name}"
-            notification.insert()
-
-            doc_url = f"{frappe.utils.get_url()}/app/{frappe.scrub(data.doctype_name)}/{data.document_name}"
-            # (Optional) Email sending
-            email_body = f"""
-            Dear {user},<br><br>
-            This is a reminder to take action on document **{data.document_name}** ({data.doctype_name}).<br>
-            This is a reminder to take action on document <a href="{doc_url}"><b>{data.document_name}</b></a>  ({data.doctype_name}).<br>
-            Current Workflow Stage: **{current_state}**<br>
-            Please review and proceed as per the workflow process.<br>
-            """
-            frappe.sendmail(
-                recipients=user,
-                subject="Workflow Reminder Alert",
-                message=email_body,
-                now=frappe.flags.in_test,
-            )
+    return frappe._dict(
+        total_shift_time=total_shift_time,
+        overdue_shift_time=shift.overdue_time,
+        role=shift.role,
+        shift=shift.shift,
+    )
 
-    except Exception as e:
-        frappe.log_error(f"Failed to send reminder: {str(e)}", "Workflow Reminder")
-                
 def check_project_permissions(user, doc):
     all_documents = [doc] + doc.get_all_children()
     
@@ -149,22 +182,157 @@ def check_project_permissions(user, doc):
     
     return True
 
-def send_notification():
-    try:
-        workflow_reminders = frappe.get_all(
-            "Workflow Reminder",
-            fields=["name", "time", "doctype_name", "document_name", "description", "total_shift_time","notification_send_time","workflow_state"],
-            filters={"notification_send": 0}
+NEXT_DUE_KEY = "workflow_transitions:next_reminder_due"
+
+# Cached as the next due time when no reminder is pending
+NO_PENDING_REMINDER = "none"
+
+
+def process_due_reminders():
+    """Scheduler tick: only touches the database once the earliest pending reminder is due."""
+    next_due = frappe.cache.get_value(NEXT_DUE_KEY)
+    if next_due is None:
+        next_due = get_next_due()
+        # SET NX: a reminder scheduled while we read the database keeps its due time
+        if not frappe.cache.set(frappe.cache.make_key(NEXT_DUE_KEY), pickle.dumps(next_due), nx=True):
+            return
+    if next_due == NO_PENDING_REMINDER or next_due > now_datetime():
+        return
+
+    digest_shifts = get_digest_shifts()
+    reminders, digest_reminders = split_digest_reminders(get_due_reminders(), digest_shifts)
+    overdue_reminders, digest_overdue_reminders = split_digest_reminders(get_due_reminders(overdue=True), digest_shifts)
+
+    send_notification(reminders)
+    send_overdue_notification(overdue_reminders)
+    send_digests(digest_shifts, digest_reminders, digest_overdue_reminders)
+    # Recomputed by the next tick from committed rows, overwriting it here could drop a reminder saved meanwhile
+    frappe.cache.delete_value(NEXT_DUE_KEY)
+
+def get_next_due():
+    """Earliest time a pending reminder can go out, held back to the next digest for digest doctypes."""
+    next_due = frappe.db.sql(
+        """
+        SELECT MIN(
+            CASE WHEN ds.enable_digest = 1 AND ds.last_digest_on IS NOT NULL
+                THEN GREATEST(pending.due, ds.last_digest_on + INTERVAL IFNULL(ds.digest_window, 0) HOUR)
+                ELSE pending.due
+            END
         )
-        for reminder in workflow_reminders:
-            if reminder.notification_send_time <= now_datetime() and frappe.db.get_value(reminder.doctype_name,reminder.document_name,"workflow_state") == reminder.workflow_state and frappe.db.get_value(reminder.doctype_name,reminder.document_name,"docstatus") == 0:
-                workflow_doc = frappe.get_doc("Workflow Reminder", reminder.get("name"))
-                send_reminder(workflow_doc)
-                workflow_doc.db_set("notification_send", 1)
+        FROM (
+            SELECT doctype_name, MIN(notification_send_time) AS due
+            FROM `tabWorkflow Reminder`
+            WHERE notification_send = 0 AND cancelled = 0
+            GROUP BY doctype_name
+            UNION ALL
+            SELECT doctype_name, MIN(overdue_time) AS due
+            FROM `tabWorkflow Reminder`
+            WHERE notification_send = 1 AND overdue_notification_send = 0 AND cancelled = 0 AND overdue_shift_time > 0
+            GROUP BY doctype_name
+        ) AS pending
+        LEFT JOIN `tabDocument Shift` ds ON ds.name = pending.doctype_name
+        """
+    )[0][0]
+    return next_due or NO_PENDING_REMINDER
+
+def schedule_next_due(due):
+    """Bring the cached next due time forward when a reminder becomes due earlier. Runs after commit."""
+    if not due:
+        return
+
+    due = frappe.utils.get_datetime(due)
+    next_due = frappe.cache.get_value(NEXT_DUE_KEY)
+    if next_due is None:
+        # Earlier reminders may be pending too, so have the next tick read them from the database
+        frappe.cache.set_value(NEXT_DUE_KEY, now_datetime())
+    elif next_due == NO_PENDING_REMINDER or due < next_due:
+        frappe.cache.set_value(NEXT_DUE_KEY, due)
+
+def cancel_reminders(doctype_name, document_name, current_state=None):
+    """
+    Cancel the reminders of a document that is no longer in their workflow state. Reminders already
+    sent are closed too, so a document that later returns to the state gets a new reminder.
+    """
+    frappe.db.sql(
+        """
+        UPDATE `tabWorkflow Reminder`
+        SET cancelled = 1
+        WHERE doctype_name = %(doctype_name)s AND document_name = %(document_name)s
+            AND cancelled = 0
+            AND (%(current_state)s IS NULL OR workflow_state != %(current_state)s)
+        """,
+        {"doctype_name": doctype_name, "document_name": document_name, "current_state": current_state},
+    )
+
+def send_notification(reminders=None):
+    try:
+        for reminder in get_due_reminders() if reminders is None else reminders:
+            workflow_doc = frappe.get_doc("Workflow Reminder", reminder.get("name"))
+            send_reminder(workflow_doc)
+            workflow_doc.db_set("notification_send", 1)
                 
     except Exception as e:
         frappe.log_error(f"Error in sending notification {str(e)}", "Workflow Reminder Error")
 
+def get_due_reminders(overdue=False):
+    """Return the reminders due now whose document is still a draft in the reminder's workflow state.
+
+    The due check runs in SQL on the (notification_send, notification_send_time) and
+    (overdue_notification_send, overdue_time) indexes, and the target documents are
+    read with one query per doctype.
+    """
+    now = now_datetime()
+    if overdue:
+        filters = {
+            "overdue_notification_send": 0,
+            "overdue_time": ["<=", now],
+            "notification_send": 1,
+            "overdue_shift_time": [">", 0],
+            "cancelled": 0,
+        }
+    else:
+        filters = {"notification_send": 0, "notification_send_time": ["<=", now], "cancelled": 0}
+
+    reminders = frappe.get_all(
+        "Workflow Reminder",
+        fields=["name", "doctype_name", "document_name", "workflow_state", "role", "description"],
+        filters=filters,
+        order_by="overdue_time" if overdue else "notification_send_time",
+    )
+
+    documents = {}
+    for reminder in reminders:
+        documents.setdefault(reminder.doctype_name, set()).add(reminder.document_name)
+
+    targets = {}
+    for doctype, names in documents.items():
+        for target in frappe.get_all(
+            doctype,
+            filters={"name": ["in", list(names)]},
+            fields=["name", "workflow_state", "docstatus"],
+        ):
+            targets[(doctype, target.name)] = target
+
+    due = []
+    stale = []
+    for reminder in reminders:
+        target = targets.get((reminder.doctype_name, reminder.document_name))
+        if target and target.workflow_state == reminder.workflow_state and target.docstatus == 0:
+            due.append(reminder)
+        else:
+            stale.append(reminder.name)
+
+    # Documents that moved on will never match again, drop them from the queue
+    if stale:
+        frappe.db.set_value("Workflow Reminder", {"name": ["in", stale]}, "cancelled", 1, update_modified=False)
+
+    return due
+
+def on_doctype_update():
+    frappe.db.add_index("Workflow Reminder", ["notification_send", "notification_send_time"])
+    frappe.db.add_index("Workflow Reminder", ["overdue_notification_send", "overdue_time"])
+    frappe.db.add_index("Workflow Reminder", ["doctype_name", "document_name"])
+
 def convert_to_time(value):
     """Convert timedelta or string to time object."""
     if isinstance(value, datetime.timedelta):
@@ -179,139 +347,181 @@ def is_holiday(date):
     return False
 
 
-def calculate_target_datetime(from_time, total_shift_hours, start_time, end_time, break_start_time, break_end_time):
-    """Calculate the target datetime when total_shift_hours are completed considering breaks and holidays."""
+class HolidayCalendar:
+    """Sorted holiday dates, loaded from the Holiday table one range at a time."""
 
-    # ✅ Safe datetime parsing with or without microseconds
-    if isinstance(from_time, str):
-        try:
-            from_time = datetime.datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S.%f")
-        except ValueError:
-            from_time = datetime.datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S")
-
-    if total_shift_hours <= 0:
-        return from_time  # No work required
-
-    total_required = datetime.timedelta(hours=total_shift_hours)
-    total_counted = datetime.timedelta()
-    current_time = from_time
-
-    while total_counted < total_required:
-        current_date = current_time.date()
+    def __init__(self, from_date, holidays=None, preload_days=120):
+        self.preload_days = preload_days
+        if holidays is not None:
+            self.dates = sorted(set(holidays))
+            self.loaded_until = datetime.date.max
+        else:
+            self.dates = []
+            self.loaded_until = from_date - datetime.timedelta(days=1)
+            self.load(from_date)
 
-        # ✅ Skip holiday
-        if is_holiday(current_date):
-            current_time = datetime.datetime.combine(current_date + datetime.timedelta(days=1), start_time)
-            continue
-
-        # ✅ Shift timings for the day
-        shift_start = datetime.datetime.combine(current_date, start_time)
-        shift_end = datetime.datetime.combine(current_date, end_time)
-        break_start = datetime.datetime.combine(current_date, break_start_time)
-        break_end = datetime.datetime.combine(current_date, break_end_time)
+    def load(self, until):
+        if until <= self.loaded_until:
+            return
 
+        start = self.loaded_until + datetime.timedelta(days=1)
+        end = max(until, start + datetime.timedelta(days=self.preload_days))
+        holidays = frappe.get_all(
+            "Holiday",
+            filters=[["holiday_date", "between", [start, end]]],
+            pluck="holiday_date",
+            distinct=True,
+        )
+        self.dates = sorted(set(self.dates).union(holidays))
+        self.loaded_until = end
+
+    def is_holiday(self, date):
+        self.load(date)
+        index = bisect.bisect_left(self.dates, date)
+        return index < len(self.dates) and self.dates[index] == date
+
+    def count(self, after, until):
+        """Number of holidays in (after, until]."""
+        self.load(until)
+        return bisect.bisect_right(self.dates, until) - bisect.bisect_right(self.dates, after)
+
+    def add_working_days(self, date, days):
+        """Return the `days`-th non-holiday date after `date`."""
+        target = date + datetime.timedelta(days=days)
+        while True:
+            candidate = date + datetime.timedelta(days=days + self.count(date, target))
+            if candidate == target:
+                return target
+            target = candidate
+
+
+def walk_shift_day(current_time, remaining, start_time, end_time, break_start_time, break_end_time):
+    """Count working time on the day of `current_time`, stopping once `remaining` is covered.
+
+    Returns (target datetime or None, time counted on this day). `remaining=None` counts the whole day.
+    """
+    current_date = current_time.date()
+    shift_start = datetime.datetime.combine(current_date, start_time)
+    shift_end = datetime.datetime.combine(current_date, end_time)
+    break_start = datetime.datetime.combine(current_date, break_start_time)
+    break_end = datetime.datetime.combine(current_date, break_end_time)
+
+    counted = datetime.timedelta()
+    while True:
         # If current time is before shift start, move to shift start
         if current_time < shift_start:
             current_time = shift_start
 
-        # If current time is after shift end, move to next day's shift start
         if current_time >= shift_end:
-            current_time = datetime.datetime.combine(current_date + datetime.timedelta(days=1), start_time)
-            continue
+            return None, counted
 
-        # ✅ Calculate working period before break
+        # Working period before break
         work_end = min(shift_end, break_start)
-
         if current_time < work_end:
             available = work_end - current_time
-            if total_counted + available >= total_required:
-                return current_time + (total_required - total_counted)
-            total_counted += available
+            if remaining is not None and counted + available >= remaining:
+                return current_time + (remaining - counted), counted
+            counted += available
+            if break_end <= current_time:
+                return None, counted
             current_time = break_end  # Skip break
             continue
 
-        # ✅ After break
-        if current_time >= break_end and current_time < shift_end:
+        # After break
+        if break_end <= current_time < shift_end:
             available = shift_end - current_time
-            if total_counted + available >= total_required:
-                return current_time + (total_required - total_counted)
-            total_counted += available
-            current_time = datetime.datetime.combine(current_date + datetime.timedelta(days=1), start_time)
-            continue
+            if remaining is not None and counted + available >= remaining:
+                return current_time + (remaining - counted), counted
+            return None, counted + available
 
-        # ✅ If inside break, skip to break end
+        # Inside break, skip to break end
         if break_start <= current_time < break_end:
             current_time = break_end
             continue
 
-        # ✅ Else move to next day
-        current_time = datetime.datetime.combine(current_date + datetime.timedelta(days=1), start_time)
+        return None, counted
+
+
+def calculate_target_datetime(from_time, total_shift_hours, start_time, end_time, break_start_time, break_end_time, holidays=None):
+    """Calculate the target datetime when total_shift_hours are completed considering breaks and holidays.
+
+    Holidays are read once into a HolidayCalendar (or taken from `holidays`), whole working days are
+    skipped arithmetically and only the first and last day are walked through.
+    """
+
+    # ✅ Safe datetime parsing with or without microseconds
+    if isinstance(from_time, str):
+        try:
+            from_time = datetime.datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S.%f")
+        except ValueError:
+            from_time = datetime.datetime.strptime(from_time, "%Y-%m-%d %H:%M:%S")
 
-    # Safety net return (should not hit ideally)
-    return current_time
+    if total_shift_hours <= 0:
+        return from_time  # No work required
 
-def send_overdue_notification():
+    shift = (start_time, end_time, break_start_time, break_end_time)
+    remaining = datetime.timedelta(hours=total_shift_hours)
+    from_date = from_time.date()
+    calendar = holidays if isinstance(holidays, HolidayCalendar) else HolidayCalendar(from_date, holidays)
+
+    # First (possibly partial) day
+    if not calendar.is_holiday(from_date):
+        target, counted = walk_shift_day(from_time, remaining, *shift)
+        if target:
+            return target
+        remaining -= counted
+
+    day_length = walk_shift_day(datetime.datetime.combine(from_date, start_time), None, *shift)[1]
+    if day_length <= datetime.timedelta():
+        frappe.throw("Document Shift has no working time between its start and end time")
+
+    # Skip the working days that are used up entirely, then finish on the next one
+    full_days = (remaining - datetime.timedelta(microseconds=1)) // day_length
+    last_day = calendar.add_working_days(from_date, full_days + 1)
+    target, _ = walk_shift_day(
+        datetime.datetime.combine(last_day, start_time), remaining - full_days * day_length, *shift
+    )
+    return target
+
+def send_overdue_notification(reminders=None):
     try:
-        overdue_reminders = frappe.get_all(
-            "Workflow Reminder",
-            fields=["name", "doctype_name", "document_name", "description", "overdue_shift_time","overdue_time","workflow_state"],
-            filters={"notification_send": 1,"overdue_shift_time": [">", 0]}
-        )
-        for reminder in overdue_reminders:
-            if reminder.overdue_time <= now_datetime() and frappe.db.get_value(reminder.doctype_name,reminder.document_name,"workflow_state") == reminder.workflow_state and frappe.db.get_value(reminder.doctype_name,reminder.document_name,"docstatus") == 0:
-                workflow_doc = frappe.get_doc("Workflow Reminder", reminder.get("name"))
-                send_overdue_email_reminder(workflow_doc)
-                workflow_doc.db_set("overdue_notification_send", 1)
+        for reminder in get_due_reminders(overdue=True) if reminders is None else reminders:
+            workflow_doc = frappe.get_doc("Workflow Reminder", reminder.get("name"))
+            send_overdue_email_reminder(workflow_doc)
+            workflow_doc.db_set("overdue_notification_send", 1)
                 
     except Exception as e:
         frappe.log_error(f"Error in sending overdue notification {str(e)}", "Workflow Reminder Error")
-        # Check if overdue time is set and send notification
                 
         
 def send_overdue_email_reminder(data):
     try:
         frappe.logger().info(f"[Reminder Debug] Triggered for: {data.name} | Doctype: {data.doctype_name} | Doc: {data.document_name} | Role: {data.role}")
 
-        workflow = frappe.get_value("Workflow", {"document_type": data.doctype_name, "is_active": 1}, "name")
-        if not workflow:
+        graph = get_workflow_graph(data.doctype_name)
+        if not graph:
             frappe.log_error("Active Workflow not found", "Workflow Reminder")
             return
 
-        workflow_doc = frappe.get_doc("Workflow", workflow)
         current_state = data.workflow_state
-        next_roles = set()
+
+        def log_condition_error(transition, eval_err):
+            frappe.log_error(f"Error evaluating condition: {transition.condition} — {str(eval_err)}", "Workflow Reminder")
 
         # Find roles responsible for next actions
-        for transition in workflow_doc.transitions:
-            if transition.state == current_state:
-                if transition.condition:
-                    try:
-                        if not frappe.safe_eval(transition.condition, {"doc": frappe.get_doc(data.doctype_name, data.document_name)}):
-                            continue
-                    except Exception as eval_err:
-                        frappe.log_error(f"Error evaluating condition: {transition.condition} — {str(eval_err)}", "Workflow Reminder")
-                        continue
-                if transition.allowed:
-                    next_roles.add(transition.allowed)
+        next_roles = graph.get_next_roles(
+            current_state,
+            frappe.get_doc(data.doctype_name, data.document_name),
+            on_error=log_condition_error,
+        )
 
         role_list = ", ".join(next_roles)
 
         # Fetch valid users for next roles
-        users_with_next_roles = frappe.get_all(
-            "Has Role",
-            filters={"role": ["in", list(next_roles)]},
-            fields=["parent"]
-        )
-
-        valid_users = set()
-        for user in users_with_next_roles:
-            if not frappe.db.exists("User", user.parent):
-                # frappe.log_error(f"[Reminder Debug] Skipping invalid user: {user.parent} (User not found)", "Workflow Reminder")
-                continue
-
-            user_doc = frappe.get_doc("User", user.parent)
-            if user_doc.enabled and user_doc.user_type == "System User" and user_doc.email and user_doc != "Administrator":
-                valid_users.add(user_doc.email)
+        valid_users = {
+            user.email for user in get_role_users(next_roles)
+            if user.email and user.user != "Administrator"
+        }
 
         users_list_html = "<br>".join(valid_users)
 
@@ -320,11 +530,7 @@ def send_overdue_email_reminder(data):
             frappe.log_error("Missing `data.role` in Workflow Reminder", "Workflow Reminder")
             return
 
-        users = frappe.get_all(
-            "Has Role",
-            filters={"role": data.role},
-            fields=["parent"]
-        )
+        users = get_role_users([data.role])
 
         if not users:
             frappe.log_error(f"No users found for role: {data.role}", "Workflow Reminder")
@@ -333,44 +539,133 @@ def send_overdue_email_reminder(data):
         base_url = frappe.utils.get_url()
         doc_link = f"{base_url}/app/{data.doctype_name.lower().replace(' ', '-')}/{data.document_name}"
 
-        for user in users:
-            if not user.parent or not frappe.db.exists("User", user.parent):
-                frappe.log_error(f"[Reminder Debug] Skipping notification: Invalid or missing user {user.parent}", "Workflow Reminder")
-                continue
-            
-            if user.parent == "Administrator":
-                frappe.log_error("[Reminder Debug] Skipping Administrator", "Workflow Reminder")
-                continue
-
-            # Create notification log
-            notification = frappe.new_doc("Notification Log")
-            notification.for_user = user.parent
-            notification.type = "Alert"
-            notification.document_type = data.doctype_name
-            notification.document_name = data.document_name
-            notification.subject = f"Overdue Reminder for {data.document_name}"
-            notification.insert()
-
-            # Compose and send email
-            email_body = f"""
-            Dear User,<br><br>
-            The following document has been delayed for more than the expected time:<br>
-            <b>Document Type:</b> {data.doctype_name}<br>
-            <b>ID:</b> {data.document_name}<br>
-            <b>Role Holder(s) Responsible for Next Action:</b> {role_list}<br><br>
-            <b>Users with Next Roles:</b><br>
-            {users_list_html}<br><br>
-            <b>Document Link:</b> <a href="{doc_link}">{data.document_name}</a><br><br>
-            Please coordinate with the responsible Role Holders to expedite the Approval/Rejection on the Document.<br>
-            Thank you and have a nice day.
-            """
-
-            frappe.sendmail(
-                recipients=user.parent,
-                subject="Workflow Overdue Reminder Alert",
-                message=email_body,
-                now=frappe.flags.in_test,
-            )
+        # Compose the email once for every role holder
+        email_body = f"""
+        Dear User,<br><br>
+        The following document has been delayed for more than the expected time:<br>
+        <b>Document Type:</b> {data.doctype_name}<br>
+        <b>ID:</b> {data.document_name}<br>
+        <b>Role Holder(s) Responsible for Next Action:</b> {role_list}<br><br>
+        <b>Users with Next Roles:</b><br>
+        {users_list_html}<br><br>
+        <b>Document Link:</b> <a href="{doc_link}">{data.document_name}</a><br><br>
+        Please coordinate with the responsible Role Holders to expedite the Approval/Rejection on the Document.<br>
+        Thank you and have a nice day.
+        """
+        fan_out(
+            [user.user for user in users if user.user != "Administrator"],
+            data.doctype_name,
+            data.document_name,
+            subject=f"Overdue Reminder for {data.document_name}",
+            email_subject="Workflow Overdue Reminder Alert",
+            email_body=email_body,
+        )
 
     except Exception as e:
         frappe.log_error(f"Failed to send overdue reminder: {str(e)}", "Workflow Reminder")
+
+
+def get_digest_shifts():
+    return {
+        shift.name: shift
+        for shift in frappe.get_all(
+            "Document Shift",
+            filters={"enable_digest": 1},
+            fields=["name", "digest_window", "last_digest_on"],
+        )
+    }
+
+def split_digest_reminders(reminders, digest_shifts):
+    """Split due reminders into (sent one by one, held for a digest)."""
+    immediate, digest = [], []
+    for reminder in reminders:
+        (digest if reminder.doctype_name in digest_shifts else immediate).append(reminder)
+    return immediate, digest
+
+def send_digests(digest_shifts, reminders, overdue_reminders):
+    """
+    Send each user one summary email of the due reminders of every digest doctype whose
+    window has elapsed, then mark all included reminders as sent in a single update.
+    """
+    now = now_datetime()
+    ready = {
+        name for name, shift in digest_shifts.items()
+        if not shift.last_digest_on
+        or frappe.utils.get_datetime(shift.last_digest_on) + datetime.timedelta(hours=frappe.utils.cint(shift.digest_window)) <= now
+    }
+    reminders = [reminder for reminder in reminders if reminder.doctype_name in ready]
+    overdue_reminders = [reminder for reminder in overdue_reminders if reminder.doctype_name in ready]
+    if not reminders and not overdue_reminders:
+        return
+
+    digests = {}
+    sent, overdue_sent = [], []
+    for reminder, overdue in [(r, False) for r in reminders] + [(r, True) for r in overdue_reminders]:
+        try:
+            if overdue:
+                users = [user.user for user in get_role_users([reminder.role]) if user.user != "Administrator"] if reminder.role else []
+                subject = f"Overdue Reminder for {reminder.document_name}"
+            else:
+                users = get_reminder_recipients(reminder)
+                subject = reminder.description or f"Reminder for {reminder.document_name}"
+
+            users = list(dict.fromkeys(user for user in users if user))
+            if users:
+                insert_notification_logs(users, reminder.doctype_name, reminder.document_name, subject)
+            for user in users:
+                digests.setdefault(user, []).append((reminder, overdue))
+        except Exception as e:
+            frappe.log_error(f"Failed to collect reminder {reminder.name} for digest: {str(e)}", "Workflow Reminder")
+            continue
+
+        (overdue_sent if overdue else sent).append(reminder.name)
+
+    base_url = frappe.utils.get_url()
+    for user, entries in digests.items():
+        rows = "".join(
+            f"""<tr><td>{reminder.doctype_name}</td>"""
+            f"""<td><a href="{base_url}/app/{frappe.scrub(reminder.doctype_name)}/{reminder.document_name}">{reminder.document_name}</a></td>"""
+            f"""<td>{reminder.workflow_state}</td><td>{"Overdue" if overdue else "Pending"}</td></tr>"""
+            for reminder, overdue in entries
+        )
+        email_body = f"""
+        Dear User,<br><br>
+        The following documents are waiting for action:<br><br>
+        <table border="1" cellpadding="4" cellspacing="0">
+        <tr><th>Document Type</th><th>ID</th><th>Workflow Stage</th><th>Status</th></tr>
+        {rows}
+        </table><br>
+        Please review and proceed as per the workflow process.<br>
+        """
+        frappe.sendmail(
+            recipients=user,
+            subject=f"Workflow Reminder Digest: {len(entries)} document(s) pending",
+            message=email_body,
+            now=frappe.flags.in_test,
+        )
+
+    mark_reminders_sent(sent, overdue_sent)
+
+    # update_modified=False keeps the cached shift configuration valid
+    digested = list({reminder.doctype_name for reminder in reminders + overdue_reminders})
+    frappe.db.set_value("Document Shift", {"name": ["in", digested]}, "last_digest_on", now, update_modified=False)
+
+def mark_reminders_sent(names, overdue_names):
+    """Flag reminders and overdue reminders as sent with one UPDATE."""
+    if not names and not overdue_names:
+        return
+
+    frappe.db.sql(
+        """
+        UPDATE `tabWorkflow Reminder`
+        SET notification_send = CASE WHEN name IN %(names)s THEN 1 ELSE notification_send END,
+            overdue_notification_send = CASE WHEN name IN %(overdue_names)s THEN 1 ELSE overdue_notification_send END
+        WHERE name IN %(all_names)s
+        """,
+        {
+            # An empty tuple renders as invalid SQL, so pad with a name that never matches
+            "names": tuple(names) or ("",),
+            "overdue_names": tuple(overdue_names) or ("",),
+            "all_names": tuple(names) + tuple(overdue_names),
+        },
+    )
@@ -0,0 +1,109 @@
+# Copyright (c) 2026, info@finbyz.tech and Contributors
+# See license.txt
+
+import datetime
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from workflow_transitions.workflow_transitions.doctype.state_change.state_change import record_transition
+from workflow_transitions.workflow_transitions.doctype.workflow_transition_rollup.workflow_transition_rollup import (
+	rebuild_rollup,
+)
+from workflow_transitions.workflow_transitions.utils.report_cache import LAST_TRANSITION_KEY, get_last_transition
+
+TEST_DOCTYPE = "_Test Rollup DocType"
+START = datetime.datetime(2026, 3, 2, 9, 0)
+
+
+def get_buckets():
+	return {
+		(row.workflow_state, row.username, str(row.day)): (
+			row.transition_count,
+			row.duration_count,
+			round(row.duration_sum, 3),
+			round(row.duration_min, 3),
+			round(row.duration_max, 3),
+		)
+		for row in frappe.get_all(
+			"Workflow Transition Rollup",
+			filters={"doctype_name": TEST_DOCTYPE},
+			fields=["workflow_state", "username", "day", "transition_count", "duration_count",
+				"duration_sum", "duration_min", "duration_max"],
+		)
+	}
+
+
+class TestWorkflowTransitionRollup(FrappeTestCase):
+	def setUp(self):
+		for name in frappe.get_all("State Change", filters={"doctype_name": TEST_DOCTYPE}, pluck="name"):
+			frappe.delete_doc("State Change", name, force=True)
+		frappe.db.delete("Workflow Transition Rollup", {"doctype_name": TEST_DOCTYPE})
+
+	def tearDown(self):
+		frappe.db.rollback()
+		frappe.cache.hdel(LAST_TRANSITION_KEY, TEST_DOCTYPE)
+
+	def record(self, document_name, workflow_state, username, minutes):
+		record_transition(
+			TEST_DOCTYPE, document_name, workflow_state, username, "System Manager",
+			START + datetime.timedelta(minutes=minutes),
+		)
+
+	def test_incremental_updates_merge_into_one_bucket(self):
+		self.record("DOC-1", "Draft", "Administrator", 0)
+		self.record("DOC-1", "Pending", "Administrator", 1)
+		self.record("DOC-2", "Draft", "Administrator", 0)
+		self.record("DOC-2", "Pending", "Administrator", 3)
+
+		buckets = get_buckets()
+		day = str(START.date())
+		# The first transition of a document has no previous state to measure
+		self.assertEqual(buckets[("Draft", "Administrator", day)], (2, 0, 0, 0, 0))
+		self.assertEqual(buckets[("Pending", "Administrator", day)], (2, 2, 240, 60, 180))
+
+	def test_incremental_updates_match_rebuild(self):
+		self.record("DOC-1", "Draft", "Administrator", 0)
+		self.record("DOC-1", "Pending", "Guest", 90)
+		self.record("DOC-1", "Approved", "Administrator", 60 * 26)
+		self.record("DOC-2", "Draft", "Guest", 5)
+		self.record("DOC-2", "Pending", "Guest", 7)
+		self.record("DOC-2", "Rejected", "Administrator", 60 * 30)
+		incremental = get_buckets()
+
+		with patch.object(frappe.db, "commit"):
+			rebuild_rollup(TEST_DOCTYPE)
+
+		self.assertEqual(get_buckets(), incremental)
+		self.assertEqual(len(incremental), 5)
+
+	def test_document_api_saves_update_the_rollup(self):
+		# What the compatibility mode Server Script does instead of record_transition
+		state_change = frappe.new_doc("State Change")
+		state_change.doctype_name = TEST_DOCTYPE
+		state_change.document_name = "DOC-3"
+		state_change.append("items", {"workflow_state": "Draft", "username": "Administrator", "modification_time": START})
+		state_change.insert(ignore_permissions=True)
+
+		state_change.append("items", {
+			"workflow_state": "Pending",
+			"username": "Administrator",
+			"modification_time": START + datetime.timedelta(minutes=2),
+		})
+		state_change.save(ignore_permissions=True)
+
+		buckets = get_buckets()
+		day = str(START.date())
+		self.assertEqual(buckets[("Draft", "Administrator", day)], (1, 0, 0, 0, 0))
+		self.assertEqual(buckets[("Pending", "Administrator", day)], (1, 1, 120, 120, 120))
+
+	def test_rebuild_clears_cached_reports(self):
+		self.record("DOC-1", "Draft", "Administrator", 0)
+		frappe.db.after_commit.run()
+		version = get_last_transition(TEST_DOCTYPE)
+
+		with patch.object(frappe.db, "commit"):
+			rebuild_rollup(TEST_DOCTYPE)
+
+		self.assertNotEqual(get_last_transition(TEST_DOCTYPE), version)
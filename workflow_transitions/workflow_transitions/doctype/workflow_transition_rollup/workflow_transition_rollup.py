@@ -0,0 +1,162 @@
+# Copyright (c) 2026, info@finbyz.tech and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+from workflow_transitions.workflow_transitions.utils.report_cache import clear_report_cache
+
+ROLLUP_COLUMNS = """(
+	name, creation, modified, modified_by, owner, docstatus, idx,
+	doctype_name, workflow_state, username, day,
+	transition_count, duration_count, duration_sum, duration_min, duration_max
+)"""
+
+# Fold a new or rebuilt bucket into an existing one. MariaDB applies these in order,
+# so min/max read duration_count before it is incremented.
+ROLLUP_MERGE = """
+	duration_min = IF(VALUES(duration_count) = 0, duration_min,
+		IF(duration_count = 0, VALUES(duration_min), LEAST(duration_min, VALUES(duration_min)))),
+	duration_max = IF(VALUES(duration_count) = 0, duration_max,
+		IF(duration_count = 0, VALUES(duration_max), GREATEST(duration_max, VALUES(duration_max)))),
+	duration_sum = duration_sum + VALUES(duration_sum),
+	duration_count = duration_count + VALUES(duration_count),
+	transition_count = transition_count + VALUES(transition_count),
+	modified = VALUES(modified)
+"""
+
+
+class WorkflowTransitionRollup(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Workflow Transition Rollup", ["doctype_name", "username", "day"])
+
+
+def rollup_name(doctype_name, workflow_state, username, day):
+	"""SQL expression for the bucket name: an md5 of (doctype, state, user, day)."""
+	return f"MD5(CONCAT_WS(CHAR(0), {doctype_name}, {workflow_state}, {username}, {day}))"
+
+
+def get_rollup_summary(doctype_name, group_by, username=None):
+	"""
+	Transition count and time-in-previous-state average/min/max in seconds per `group_by`
+	("username" or "workflow_state") for one doctype, read from the rollup buckets.
+	"""
+	if group_by not in ("username", "workflow_state"):
+		frappe.throw(f"Cannot group the transition rollup by {group_by}")
+
+	return frappe.db.sql(
+		f"""
+		SELECT
+			{group_by},
+			SUM(transition_count) AS transition_count,
+			SUM(duration_sum) / NULLIF(SUM(duration_count), 0) AS avg_duration,
+			MIN(IF(duration_count > 0, duration_min, NULL)) AS min_duration,
+			MAX(IF(duration_count > 0, duration_max, NULL)) AS max_duration
+		FROM `tabWorkflow Transition Rollup`
+		WHERE doctype_name = %(doctype_name)s AND (%(username)s IS NULL OR username = %(username)s)
+		GROUP BY {group_by}
+		ORDER BY {group_by}
+		""",
+		{"doctype_name": doctype_name, "username": username},
+		as_dict=True,
+	)
+
+
+def update_rollup(doctype_name, workflow_state, username, modification_time, previous_time=None):
+	"""Add one transition to its (doctype, state, user, day) bucket; `previous_time` is when the previous state began."""
+	frappe.db.sql(
+		f"""
+		INSERT INTO `tabWorkflow Transition Rollup` {ROLLUP_COLUMNS}
+		SELECT
+			{rollup_name("%(doctype_name)s", "%(workflow_state)s", "%(username)s", "DATE(%(modification_time)s)")},
+			NOW(6), NOW(6), %(user)s, %(user)s, 0, 0,
+			%(doctype_name)s, %(workflow_state)s, %(username)s, DATE(%(modification_time)s),
+			1, d.measured, d.duration, d.duration, d.duration
+		FROM (
+			SELECT
+				IF(%(previous_time)s IS NULL, 0, 1) AS measured,
+				IFNULL(TIMESTAMPDIFF(MICROSECOND, %(previous_time)s, %(modification_time)s) / 1000000, 0) AS duration
+		) AS d
+		ON DUPLICATE KEY UPDATE {ROLLUP_MERGE}
+		""",
+		{
+			"doctype_name": doctype_name,
+			"workflow_state": workflow_state or "",
+			"username": username or "",
+			"modification_time": modification_time,
+			"previous_time": previous_time,
+			"user": frappe.session.user,
+		},
+	)
+
+
+def rebuild_rollup(doctype_name=None, chunk_size=500):
+	"""
+	Recompute the rollup from State Change history, one chunk of State Change documents at a time.
+	Each chunk is committed on its own so long rebuilds do not hold one large transaction.
+	The cached reports of the rebuilt doctypes are cleared once it is done.
+	"""
+	doctype_names = [doctype_name] if doctype_name else frappe.db.sql(
+		"SELECT DISTINCT doctype_name FROM `tabState Change`", pluck=True
+	)
+	if doctype_name:
+		frappe.db.delete("Workflow Transition Rollup", {"doctype_name": doctype_name})
+	else:
+		frappe.db.delete("Workflow Transition Rollup")
+	frappe.db.commit()
+
+	after = ""
+	total = 0
+	while True:
+		parents = frappe.db.sql(
+			"""
+			SELECT name
+			FROM `tabState Change`
+			WHERE name > %(after)s AND (%(doctype_name)s IS NULL OR doctype_name = %(doctype_name)s)
+			ORDER BY name
+			LIMIT %(chunk_size)s
+			""",
+			{"after": after, "doctype_name": doctype_name, "chunk_size": chunk_size},
+			pluck=True,
+		)
+		if not parents:
+			break
+
+		frappe.db.sql(
+			f"""
+			INSERT INTO `tabWorkflow Transition Rollup` {ROLLUP_COLUMNS}
+			SELECT
+				{rollup_name("t.doctype_name", "t.workflow_state", "t.username", "t.day")},
+				NOW(6), NOW(6), %(user)s, %(user)s, 0, 0,
+				t.doctype_name, t.workflow_state, t.username, t.day,
+				COUNT(*), COUNT(t.duration), IFNULL(SUM(t.duration), 0), IFNULL(MIN(t.duration), 0), IFNULL(MAX(t.duration), 0)
+			FROM (
+				SELECT
+					sc.doctype_name,
+					IFNULL(sci.workflow_state, '') AS workflow_state,
+					IFNULL(sci.username, '') AS username,
+					DATE(sci.modification_time) AS day,
+					TIMESTAMPDIFF(
+						MICROSECOND,
+						LAG(sci.modification_time) OVER (PARTITION BY sci.parent ORDER BY sci.modification_time),
+						sci.modification_time
+					) / 1000000 AS duration
+				FROM `tabState Change Items` AS sci
+				JOIN `tabState Change` AS sc ON sc.name = sci.parent
+				WHERE sci.parent IN %(parents)s
+			) AS t
+			GROUP BY t.doctype_name, t.workflow_state, t.username, t.day
+			ON DUPLICATE KEY UPDATE {ROLLUP_MERGE}
+			""",
+			{"parents": tuple(parents), "user": frappe.session.user},
+		)
+		frappe.db.commit()
+
+		total += len(parents)
+		after = parents[-1]
+
+	clear_report_cache(doctype_names)
+	return total
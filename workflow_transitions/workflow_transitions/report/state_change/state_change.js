@@ -20,5 +20,43 @@ frappe.query_reports["State change"] = {
 				return doctype;
 			},
 		},
-	]
+		{
+			fieldname: "page_length",
+			label: __("Documents per Page"),
+			fieldtype: "Int",
+			default: 500,
+		},
+		{
+			fieldname: "after",
+			label: __("Start After Document"),
+			fieldtype: "Data",
+		},
+		{
+			fieldname: "use_rollup",
+			label: __("Summary from Rollup"),
+			fieldtype: "Check",
+			description: __("Per-state summary from the Workflow Transition Rollup"),
+		},
+		{
+			fieldname: "user",
+			label: __("User"),
+			fieldtype: "Link",
+			options: "User",
+			depends_on: "use_rollup",
+		},
+	],
+
+	onload: function (report) {
+		report.page.add_inner_button(__("Next Page"), function () {
+			let data = frappe.query_report.data || [];
+			if (frappe.query_report.get_filter_value("document") || !data.length) {
+				return;
+			}
+			// Keyset pagination: continue after the last document of this page
+			frappe.query_report.set_filter_value("after", data[data.length - 1]["Document Type"]);
+		});
+		report.page.add_inner_button(__("First Page"), function () {
+			frappe.query_report.set_filter_value("after", "");
+		});
+	},
 };
@@ -1,100 +1,54 @@
 import frappe
+from frappe.utils import cint
+
+from workflow_transitions.workflow_transitions.doctype.workflow_transition_rollup.workflow_transition_rollup import (
+    get_rollup_summary,
+)
+from workflow_transitions.workflow_transitions.utils.report_cache import get_cached_report
+
+# Documents per page in "doctype only" mode
+PAGE_LENGTH = 500
 
 def execute(filters=None):
+    return get_cached_report("State change", filters, "workflow_transitions.workflow_transitions.report.state_change.state_change.get_report")
+
+def get_report(filters):
     # Ensure that the filter for Doctype and Document is provided
     doctype = filters.get("doctype")
     document_name = filters.get("document")
     
-    if filters.get("doctype") and not filters.get("document"):
+    # Per-state summary from the rollup instead of the per-document history
+    if filters.get("doctype") and not filters.get("document") and filters.get("use_rollup"):
+        columns = [
+            {"fieldname": "workflow_state", "label": "Workflow State", "fieldtype": "Data"},
+            {"fieldname": "transition_count", "label": "Transition Count", "fieldtype": "Int"},
+            {"fieldname": "avg_duration", "label": "Avg Time in Previous State", "fieldtype": "Duration"},
+            {"fieldname": "min_duration", "label": "Min Time in Previous State", "fieldtype": "Duration"},
+            {"fieldname": "max_duration", "label": "Max Time in Previous State", "fieldtype": "Duration"},
+        ]
+        return columns, get_rollup_summary(doctype, "workflow_state", filters.get("user"))
+
+    elif filters.get("doctype") and not filters.get("document"):
         columns = [
             {"fieldname": "ID", "label": "ID", "fieldtype": "Link", "options": "State Change"},  # Corrected "option" to "options"
             {"fieldname": "Doctype", "label": "Doctype", "fieldtype": "Data"},
             {"fieldname": "Document Type", "label": "Document Type", "fieldtype": "Data"},
         ]
-        
-        # Fetch distinct workflow states for the selected doctype
-        workflow_states = frappe.db.sql("""
-            SELECT DISTINCT sci.workflow_state
-            FROM `tabState Change` AS sc
-            JOIN `tabState Change Items` AS sci
-            ON sc.name = sci.parent
-            WHERE sc.doctype_name = %s
-        """, (doctype,), as_dict=True)
 
-        # Dynamically create columns based on the number of workflow states
-        for i, state in enumerate(workflow_states, start=1):
+        # One set of columns per transition of the longest history, kept up to date by record_transition
+        max_transitions = frappe.db.sql("""
+            SELECT IFNULL(MAX(transition_count), 0)
+            FROM `tabState Change`
+            WHERE doctype_name = %s
+        """, (doctype,))[0][0]
+
+        for i in range(1, max_transitions + 1):
             columns.append({"fieldname": f"Username_{i}", "label": f"Username (State {i})", "fieldtype": "Data"})
             columns.append({"fieldname": f"Role_{i}", "label": f"Role (State {i})", "fieldtype": "Data"})
             columns.append({"fieldname": f"Workflow_State_{i}", "label": f"Workflow State (State {i})", "fieldtype": "Data"})
             columns.append({"fieldname": f"Modification_Time_{i}", "label": f"Modification Time (State {i})", "fieldtype": "Data"})
-        
-        # Fetch data for all state changes related to the selected doctype
-        state_changes = frappe.db.sql("""
-            SELECT 
-                sc.name As name,
-                sc.doctype_name AS doctype,
-                sc.document_name AS document_type,
-                sci.username AS username,
-                sci.role AS role,
-                sci.workflow_state AS workflow_state,
-                sci.modification_time AS modification_time,
-                ROW_NUMBER() OVER (PARTITION BY sc.document_name ORDER BY sci.modification_time) AS row_num
-            FROM 
-                `tabState Change` AS sc
-            JOIN 
-                `tabState Change Items` AS sci
-            ON 
-                sc.name = sci.parent
-            WHERE 
-                sc.doctype_name = %s
-        """, (doctype,), as_dict=True)
-
-        # Prepare the data for the report, ensuring one row per document
-        data = {}
-        for change in state_changes:
-            # Initialize the row if it doesn't exist
-            if change.document_type not in data:
-                data[change.document_type] = {
-                    "id": change.name,  # Add the "id" key here
-                    "doctype": change.doctype,
-                    "document_type": change.document_type,
-                }
-            
-            # Map the data to the respective columns based on row number
-            row_num = change.row_num
-            username_column = f"Username_{row_num}"
-            role_column = f"Role_{row_num}"
-            state_column = f"Workflow_State_{row_num}"
-            time_column = f"Modification_Time_{row_num}"
-
-            # Convert datetime to string for modification_time
-            modification_time_str = change.modification_time.strftime("%Y-%m-%d %H:%M:%S") if change.modification_time else "N/A"
-
-            # Assign the values for each workflow state
-            data[change.document_type][username_column] = change.username
-            data[change.document_type][role_column] = change.role
-            data[change.document_type][state_column] = change.workflow_state
-            data[change.document_type][time_column] = modification_time_str
 
-        # Convert the dictionary to a list of rows
-        report_data = []
-        for document_type, row_data in data.items():
-            row = [
-                row_data.get("id", "N/A"),  # Ensure id is included
-                row_data["doctype"],
-                row_data["document_type"],
-            ]
-            
-            # Append the workflow state columns dynamically
-            for i in range(1, len(workflow_states) + 1):
-                row.append(row_data.get(f"Username_{i}", "N/A"))
-                row.append(row_data.get(f"Role_{i}", "N/A"))
-                row.append(row_data.get(f"Workflow_State_{i}", "N/A"))
-                row.append(row_data.get(f"Modification_Time_{i}", "N/A"))
-            
-            report_data.append(row)
-
-        return columns, report_data
+        return columns, get_pivoted_transitions(doctype, max_transitions, filters.get("after"), cint(filters.get("page_length")) or PAGE_LENGTH)
     
     elif filters.get("doctype") and filters.get("document"):
         columns = [
@@ -143,3 +97,52 @@ def execute(filters=None):
             ])
 
         return columns, data
+
+
+def get_pivoted_transitions(doctype, max_transitions, after=None, page_length=PAGE_LENGTH):
+    """
+    One row per document with its transitions spread over numbered columns, pivoted in SQL.
+    Documents are paged by name: pass the last document of a page as `after` to get the next one.
+    """
+    pivot_columns = []
+    for i in range(1, max_transitions + 1):
+        pivot_columns += [
+            f"IFNULL(MAX(CASE WHEN t.row_num = {i} THEN t.username END), 'N/A')",
+            f"IFNULL(MAX(CASE WHEN t.row_num = {i} THEN t.role END), 'N/A')",
+            f"IFNULL(MAX(CASE WHEN t.row_num = {i} THEN t.workflow_state END), 'N/A')",
+            f"IFNULL(MAX(CASE WHEN t.row_num = {i} THEN t.modification_time END), 'N/A')",
+        ]
+
+    # Keyset pagination on (doctype_name, document_name), so a page never scans earlier documents
+    page = frappe.db.sql("""
+        SELECT name
+        FROM `tabState Change`
+        WHERE doctype_name = %s AND document_name > %s
+        ORDER BY document_name
+        LIMIT %s
+    """, (doctype, after or "", page_length), pluck=True)
+    if not page:
+        return []
+
+    return frappe.db.sql(f"""
+        SELECT
+            sc.name,
+            sc.doctype_name,
+            sc.document_name
+            {"".join(", " + column for column in pivot_columns)}
+        FROM `tabState Change` AS sc
+        LEFT JOIN (
+            SELECT
+                sci.parent,
+                sci.username,
+                sci.role,
+                sci.workflow_state,
+                IFNULL(DATE_FORMAT(sci.modification_time, '%%Y-%%m-%%d %%H:%%i:%%s'), 'N/A') AS modification_time,
+                ROW_NUMBER() OVER (PARTITION BY sci.parent ORDER BY sci.modification_time) AS row_num
+            FROM `tabState Change Items` AS sci
+            WHERE sci.parent IN %(page)s
+        ) AS t ON t.parent = sc.name
+        WHERE sc.name IN %(page)s
+        GROUP BY sc.name, sc.doctype_name, sc.document_name
+        ORDER BY sc.document_name
+    """, {"page": tuple(page)}, as_list=True)
@@ -27,6 +27,12 @@ frappe.query_reports["State Change User"] = {
 			"label": __("User"),
 			"fieldtype": "Link",
 			"options": "User"
+		},
+		{
+			"fieldname": "use_rollup",
+			"label": __("Summary from Rollup"),
+			"fieldtype": "Check",
+			"description": __("Read user summaries from the Workflow Transition Rollup")
 		}
 	]
 };
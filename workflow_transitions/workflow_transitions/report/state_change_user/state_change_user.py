@@ -1,6 +1,10 @@
 import frappe
 from datetime import timedelta
-from collections import defaultdict
+
+from workflow_transitions.workflow_transitions.doctype.workflow_transition_rollup.workflow_transition_rollup import (
+    get_rollup_summary,
+)
+from workflow_transitions.workflow_transitions.utils.report_cache import get_cached_report
 
 def format_duration(td):
     total_seconds = int(td.total_seconds())
@@ -9,7 +13,16 @@ def format_duration(td):
     minutes, _ = divmod(rem, 60)
     return f"{days}d {hours}h {minutes}m" if days else f"{hours}h {minutes}m"
 
+def format_microseconds(microseconds):
+    return format_duration(timedelta(microseconds=float(microseconds))) if microseconds is not None else "0"
+
+def format_seconds(seconds):
+    return format_duration(timedelta(seconds=float(seconds))) if seconds is not None else "0"
+
 def execute(filters=None):
+    return get_cached_report("State Change User", filters, "workflow_transitions.workflow_transitions.report.state_change_user.state_change_user.get_report")
+
+def get_report(filters):
     doctype = filters.get("doctype")
     document_name = filters.get("document")
     user_filter = filters.get("user")
@@ -24,15 +37,7 @@ def execute(filters=None):
 
     # Case 4: Doctype + Document + User
     if doctype and document_name and user_filter:
-        all_transitions = frappe.db.sql("""
-            SELECT sci.workflow_state, sci.username, sci.role, sci.modification_time
-            FROM `tabState Change` sc
-            JOIN `tabState Change Items` sci ON sc.name = sci.parent
-            WHERE sc.doctype_name = %s AND sc.document_name = %s
-            ORDER BY sci.modification_time
-        """, (doctype, document_name), as_dict=True)
-
-        user_transitions = [row for row in all_transitions if row.username == user_filter]
+        user_transitions = get_document_transitions(doctype, document_name, user_filter)
 
         if not user_transitions:
             return detailed_columns, [{
@@ -43,87 +48,32 @@ def execute(filters=None):
                 "duration": "User has no actions on this document."
             }]
 
-        data = []
-        durations = []
-
-        for user_row in user_transitions:
-            user_time = user_row.modification_time
-            previous_time = None
-
-            for row in reversed(all_transitions):
-                if row.modification_time < user_time:
-                    previous_time = row.modification_time
-                    break
-
-            if previous_time:
-                delta = user_time - previous_time
-                delta_str = format_duration(delta)
-                durations.append(delta)
-            else:
-                delta_str = "0"
-
-            data.append({
-                "workflow_state": user_row.workflow_state,
-                "username": user_row.username,
-                "role": user_row.role,
-                "modification_time": user_row.modification_time,
-                "duration": delta_str
-            })
-
-        avg_duration = format_duration(sum(durations, timedelta()) / len(durations)) if durations else "0"
-        data.append({
-            "workflow_state": "",
-            "username": "",
-            "role": "",
-            "modification_time": None,
-            "duration": f"Average Duration: {avg_duration}"
-        })
-
-        return detailed_columns, data
+        return detailed_columns, format_transitions(user_transitions)
 
     # Case 1: Doctype + Document
     elif doctype and document_name:
-        transitions = frappe.db.sql("""
-            SELECT sci.workflow_state, sci.username, sci.role, sci.modification_time
-            FROM `tabState Change` AS sc
-            JOIN `tabState Change Items` AS sci ON sc.name = sci.parent
-            WHERE sc.doctype_name = %s AND sc.document_name = %s
-            ORDER BY sci.modification_time
-        """, (doctype, document_name), as_dict=True)
-
-        data = []
-        durations = []
-        prev_time = None
-
-        for idx, row in enumerate(transitions):
-            curr_time = row.modification_time
-            if idx == 0 or not prev_time:
-                delta = timedelta()
-                delta_str = "0"
-            else:
-                delta = curr_time - prev_time
-                delta_str = format_duration(delta)
-                durations.append(delta)
-
-            data.append({
-                "workflow_state": row.workflow_state,
-                "username": row.username,
-                "role": row.role,
-                "modification_time": curr_time,
-                "duration": delta_str
-            })
-            prev_time = curr_time
+        return detailed_columns, format_transitions(get_document_transitions(doctype, document_name))
 
-        avg_duration = format_duration(sum(durations, timedelta()) / len(durations)) if durations else "0"
-        data.append({
-            "workflow_state": "",
-            "username": "",
-            "role": "",
-            "modification_time": None,
-            "duration": f"Average Duration: {avg_duration}"
-        })
+    # Case 2 and 3 from the rollup: transition counts and time spent in the previous state
+    elif doctype and filters.get("use_rollup"):
+        columns = [
+            {"fieldname": "username", "label": "User", "fieldtype": "Link", "options": "User"},
+            {"fieldname": "transition_count", "label": "Transition Count", "fieldtype": "Int"},
+            {"fieldname": "avg_duration", "label": "Avg Time in Previous State", "fieldtype": "Data"},
+            {"fieldname": "min_duration", "label": "Min Time in Previous State", "fieldtype": "Data"},
+            {"fieldname": "max_duration", "label": "Max Time in Previous State", "fieldtype": "Data"},
+        ]
 
-        return detailed_columns, data
+        return columns, [
+            {
+                "username": row.username,
+                "transition_count": row.transition_count,
+                "avg_duration": format_seconds(row.avg_duration),
+                "min_duration": format_seconds(row.min_duration),
+                "max_duration": format_seconds(row.max_duration),
+            }
+            for row in get_rollup_summary(doctype, "username", user_filter)
+        ]
 
     # Case 2: Doctype + User
     elif doctype and user_filter:
@@ -133,35 +83,13 @@ def execute(filters=None):
             {"fieldname": "avg_duration", "label": "Avg Duration (HH:MM:SS)", "fieldtype": "Data"}
         ]
 
-        transitions = frappe.db.sql("""
-            SELECT sc.document_name, sci.username, sci.modification_time
-            FROM `tabState Change` sc
-            JOIN `tabState Change Items` sci ON sc.name = sci.parent
-            WHERE sc.doctype_name = %s AND sci.username = %s
-            ORDER BY sc.document_name, sci.modification_time
-        """, (doctype, user_filter), as_dict=True)
-
-        durations = []
-        doc_set = set()
-        prev_doc = None
-        prev_time = None
-
-        for row in transitions:
-            doc = row.document_name
-            time = row.modification_time
-            doc_set.add(doc)
-            if prev_doc == doc and prev_time:
-                delta = time - prev_time
-                durations.append(delta)
-            prev_doc = doc
-            prev_time = time
-
-        avg_str = format_duration(sum(durations, timedelta()) / len(durations)) if durations else "0"
+        summary = get_user_summary(doctype, user_filter)
+        row = summary[0] if summary else frappe._dict(document_count=0, avg_duration=None)
 
         return columns, [{
             "username": user_filter,
-            "document_count": len(doc_set),
-            "avg_duration": avg_str
+            "document_count": row.document_count,
+            "avg_duration": format_microseconds(row.avg_duration)
         }]
 
     # Case 3: Doctype only (summary of all users)
@@ -172,38 +100,83 @@ def execute(filters=None):
             {"fieldname": "avg_duration", "label": "Avg Duration (HH:MM:SS)", "fieldtype": "Data"}
         ]
 
-        transitions = frappe.db.sql("""
-            SELECT sc.document_name, sci.username, sci.modification_time
+        # Users without a measurable duration are left out, as before
+        return columns, [
+            {
+                "username": row.username,
+                "document_count": row.document_count,
+                "avg_duration": format_microseconds(row.avg_duration)
+            }
+            for row in get_user_summary(doctype)
+            if row.duration_count
+        ]
+
+
+def get_document_transitions(doctype, document_name, user=None):
+    """
+    Transitions of one document in order, each with the microseconds since the transition
+    before it (any user), computed with LAG. `user` keeps only that user's transitions.
+    """
+    return frappe.db.sql("""
+        SELECT
+            t.workflow_state, t.username, t.role, t.modification_time,
+            TIMESTAMPDIFF(MICROSECOND, t.previous_time, t.modification_time) AS duration
+        FROM (
+            SELECT
+                sci.workflow_state, sci.username, sci.role, sci.modification_time,
+                LAG(sci.modification_time) OVER (PARTITION BY sci.parent ORDER BY sci.modification_time) AS previous_time
+            FROM `tabState Change` AS sc
+            JOIN `tabState Change Items` AS sci ON sc.name = sci.parent
+            WHERE sc.doctype_name = %(doctype)s AND sc.document_name = %(document_name)s
+        ) AS t
+        WHERE %(user)s IS NULL OR t.username = %(user)s
+        ORDER BY t.modification_time
+    """, {"doctype": doctype, "document_name": document_name, "user": user}, as_dict=True)
+
+
+def format_transitions(transitions):
+    data = []
+    for row in transitions:
+        data.append({
+            "workflow_state": row.workflow_state,
+            "username": row.username,
+            "role": row.role,
+            "modification_time": row.modification_time,
+            "duration": format_microseconds(row.duration) if row.duration is not None else "0"
+        })
+
+    durations = [row.duration for row in transitions if row.duration is not None]
+    avg_duration = format_microseconds(sum(durations) / len(durations)) if durations else "0"
+    data.append({
+        "workflow_state": "",
+        "username": "",
+        "role": "",
+        "modification_time": None,
+        "duration": f"Average Duration: {avg_duration}"
+    })
+    return data
+
+
+def get_user_summary(doctype, user=None):
+    """
+    Per user: distinct documents touched and the average time between the user's consecutive
+    transitions on the same document, aggregated in the database.
+    """
+    return frappe.db.sql("""
+        SELECT
+            t.username,
+            COUNT(DISTINCT t.parent) AS document_count,
+            COUNT(t.previous_time) AS duration_count,
+            AVG(TIMESTAMPDIFF(MICROSECOND, t.previous_time, t.modification_time)) AS avg_duration
+        FROM (
+            SELECT
+                sci.parent, sci.username, sci.modification_time,
+                LAG(sci.modification_time) OVER (
+                    PARTITION BY sci.parent, sci.username ORDER BY sci.modification_time
+                ) AS previous_time
             FROM `tabState Change` AS sc
             JOIN `tabState Change Items` AS sci ON sc.name = sci.parent
-            WHERE sc.doctype_name = %s
-            ORDER BY sc.document_name, sci.username, sci.modification_time
-        """, (doctype,), as_dict=True)
-
-        user_data = defaultdict(lambda: {"durations": [], "documents": set(), "prev_doc": None, "prev_time": None})
-
-        for row in transitions:
-            user = row.username
-            doc = row.document_name
-            time = row.modification_time
-
-            user_data[user]["documents"].add(doc)
-            if user_data[user]["prev_doc"] == doc and user_data[user]["prev_time"]:
-                delta = time - user_data[user]["prev_time"]
-                user_data[user]["durations"].append(delta)
-
-            user_data[user]["prev_doc"] = doc
-            user_data[user]["prev_time"] = time
-
-        data = []
-        for user, info in user_data.items():
-            if info["durations"]:
-                avg = sum(info["durations"], timedelta()) / len(info["durations"])
-                avg_str = format_duration(avg)
-                data.append({
-                    "username": user,
-                    "document_count": len(info["documents"]),
-                    "avg_duration": avg_str
-                })
-
-        return columns, data
\ No newline at end of file
+            WHERE sc.doctype_name = %(doctype)s AND (%(user)s IS NULL OR sci.username = %(user)s)
+        ) AS t
+        GROUP BY t.username
+    """, {"doctype": doctype, "user": user}, as_dict=True)
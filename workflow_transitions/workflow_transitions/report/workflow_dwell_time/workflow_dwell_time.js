@@ -0,0 +1,33 @@
+// Copyright (c) 2026, info@finbyz.tech and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["Workflow Dwell Time"] = {
+	"filters": [
+		{
+			"fieldname": "doctype",
+			"label": __("Select Doctype"),
+			"fieldtype": "Link",
+			"options": "DocType",
+			"reqd": 1
+		},
+		{
+			"fieldname": "from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.add_months(frappe.datetime.get_today(), -1)
+		},
+		{
+			"fieldname": "to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date",
+			"default": frappe.datetime.get_today()
+		},
+		{
+			"fieldname": "group_by",
+			"label": __("Group By"),
+			"fieldtype": "Select",
+			"options": "State\nTransition",
+			"default": "State"
+		}
+	]
+};
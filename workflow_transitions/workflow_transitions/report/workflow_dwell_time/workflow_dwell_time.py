@@ -0,0 +1,26 @@
+# Copyright (c) 2026, info@finbyz.tech and contributors
+# For license information, please see license.txt
+
+from workflow_transitions.workflow_transitions.doctype.workflow_dwell_digest.workflow_dwell_digest import (
+    get_dwell_percentiles,
+)
+
+
+def execute(filters=None):
+    filters = filters or {}
+
+    columns = [{"fieldname": "workflow_state", "label": "Workflow State", "fieldtype": "Data", "width": 180}]
+    if filters.get("group_by") == "Transition":
+        columns.append({"fieldname": "next_state", "label": "Next State", "fieldtype": "Data", "width": 180})
+    columns += [
+        {"fieldname": "transition_count", "label": "Transitions", "fieldtype": "Int"},
+        {"fieldname": "p50", "label": "p50 Time in State", "fieldtype": "Duration"},
+        {"fieldname": "p90", "label": "p90 Time in State", "fieldtype": "Duration"},
+        {"fieldname": "p99", "label": "p99 Time in State", "fieldtype": "Duration"},
+    ]
+
+    percentiles = get_dwell_percentiles(filters.get("doctype"), filters.get("from_date"), filters.get("to_date"))
+    data = percentiles["edges"] if filters.get("group_by") == "Transition" else percentiles["states"]
+
+    # Slowest states first: the p90 tail is where approvals get stuck
+    return columns, sorted(data, key=lambda row: row["p90"], reverse=True)
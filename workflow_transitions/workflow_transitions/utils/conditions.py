@@ -0,0 +1,56 @@
+import unicodedata
+from functools import lru_cache
+
+import frappe
+
+# These are frappe.safe_eval internals; if a Frappe upgrade moves them, conditions are
+# evaluated with frappe.safe_eval itself, only without the compiled-code cache.
+try:
+    from frappe.utils.safe_exec import (
+        WHITELISTED_SAFE_EVAL_GLOBALS,
+        FrappeTransformer,
+        _validate_safe_eval_syntax,
+    )
+    from RestrictedPython import compile_restricted
+except ImportError:
+    compile_restricted = None
+
+# Distinct condition strings across Workflow Transitions and Shift Details
+CONDITION_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=CONDITION_CACHE_SIZE)
+def compile_condition(condition):
+    """Compile `condition` exactly as `frappe.safe_eval` does, once per distinct string."""
+    condition = unicodedata.normalize("NFKC", condition)
+    _validate_safe_eval_syntax(condition)
+    return compile_restricted(condition, filename="<safe_eval>", policy=FrappeTransformer, mode="eval")
+
+
+def evaluate_condition(condition, eval_globals=None, eval_locals=None):
+    """Drop-in replacement for `frappe.safe_eval` that reuses the compiled code of `condition`."""
+    if compile_restricted is None:
+        return frappe.safe_eval(condition, eval_globals, eval_locals)
+
+    code = compile_condition(condition)
+
+    eval_globals = dict(eval_globals or {})
+    eval_globals["__builtins__"] = {}
+    eval_globals.update(WHITELISTED_SAFE_EVAL_GLOBALS)
+    return run_restricted(code, eval_globals, eval_locals)
+
+
+def run_restricted(code, eval_globals, eval_locals):
+    # `code` only ever comes from compile_condition: RestrictedPython output with Frappe's
+    # transformer, run with no builtins and the safe_eval whitelist, as frappe.safe_eval does.
+    return eval(code, eval_globals, eval_locals)  # nosemgrep
+
+
+def get_condition_cache_info():
+    """Hit/miss counters of the compiled condition cache for this process."""
+    info = compile_condition.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "maxsize": info.maxsize}
+
+
+def clear_condition_cache():
+    compile_condition.cache_clear()
@@ -0,0 +1,277 @@
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import frappe
+
+# Connections kept open per outgoing Email Account
+SMTP_POOL_SIZE = 4
+# Messages per second per Email Account, overridable with `workflow_email_smtp_rate_limit` in site config
+SMTP_RATE_LIMIT = 10
+SMTP_RETRIES = 3
+SMTP_BACKOFF = 1.0
+
+# (site, Email Account, modified) -> SMTPPool, reused by every job of this worker process
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class SMTPPool:
+    """A bounded pool of reusable SMTP sessions to one server."""
+
+    def __init__(self, host, port, login=None, password=None, use_ssl=False, use_tls=False, size=SMTP_POOL_SIZE, rate_limit=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.login = login
+        self.password = password
+        self.use_ssl = use_ssl
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.idle = queue.LifoQueue()
+        self.slots = threading.BoundedSemaphore(size)
+        # Shared by every batch sent through this account
+        self.limiter = RateLimiter(rate_limit)
+
+    def connect(self):
+        if self.use_ssl:
+            session = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+            if self.use_tls:
+                session.ehlo()
+                session.starttls()
+        session.ehlo()
+        if self.login and self.password:
+            session.login(self.login, self.password)
+        return session
+
+    def acquire(self):
+        self.slots.acquire()
+        try:
+            session = self.idle.get_nowait()
+        except queue.Empty:
+            session = None
+
+        if session is not None and not is_alive(session):
+            close_session(session)
+            session = None
+
+        try:
+            return session or self.connect()
+        except Exception:
+            self.slots.release()
+            raise
+
+    def release(self, session, broken=False):
+        if broken:
+            close_session(session)
+        else:
+            self.idle.put(session)
+        self.slots.release()
+
+    def close(self):
+        while True:
+            try:
+                close_session(self.idle.get_nowait())
+            except queue.Empty:
+                return
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def is_alive(session):
+    try:
+        return session.noop()[0] == 250
+    except (smtplib.SMTPException, OSError):
+        return False
+
+
+def close_session(session):
+    try:
+        session.quit()
+    except Exception:
+        pass
+
+
+def send_once(pool, sender, recipient, content):
+    session = pool.acquire()
+    broken = True
+    try:
+        session.sendmail(sender, [recipient], content)
+        broken = False
+    finally:
+        # The slot is always given back; a session that raised may be mid-transaction, so it is closed
+        pool.release(session, broken=broken)
+
+
+def deliver(messages, pool, retries=SMTP_RETRIES, backoff=SMTP_BACKOFF):
+    """
+    Send `messages`, a list of (sender, recipient, message string), through `pool` using up to
+    `pool.size` threads at the pool's rate limit. Failed sends are retried with exponential backoff on a fresh session.
+    Runs without frappe context so it can be called from worker threads.
+
+    Returns the batch stats: sent, failed recipients, elapsed seconds, average latency and throughput.
+    """
+    def send(message):
+        sender, recipient, content = message
+        started = time.monotonic()
+        for attempt in range(retries + 1):
+            pool.limiter.wait()
+            try:
+                send_once(pool, sender, recipient, content)
+            except (smtplib.SMTPException, OSError):
+                if attempt == retries:
+                    return recipient, None
+                time.sleep(backoff * 2**attempt)
+                continue
+            except Exception:
+                # Not a connection problem (e.g. a body the server cannot encode), a retry fails the same way
+                return recipient, None
+            return recipient, time.monotonic() - started
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        results = list(executor.map(send, messages))
+    elapsed = time.monotonic() - started
+
+    latencies = [latency for _, latency in results if latency is not None]
+    return frappe._dict(
+        sent=len(latencies),
+        failed=[recipient for recipient, latency in results if latency is None],
+        elapsed=elapsed,
+        latency=sum(latencies) / len(latencies) if latencies else 0,
+        throughput=len(latencies) / elapsed if elapsed else 0,
+    )
+
+
+def get_pool(email_account):
+    """
+    The pool of `email_account` on the current site. Pools are keyed by the account's `modified`,
+    so a saved Email Account gets a new pool and the old one is closed.
+    """
+    site = frappe.local.site
+    key = (site, email_account.name, str(email_account.modified))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            for stale in [k for k in _pools if k[:2] == key[:2]]:
+                _pools.pop(stale).close()
+
+            login = email_account.login_id if email_account.login_id_is_different else email_account.email_id
+            pool = _pools[key] = SMTPPool(
+                email_account.smtp_server,
+                frappe.utils.cint(email_account.smtp_port) or (465 if email_account.use_ssl_for_outgoing else 587 if email_account.use_tls else 25),
+                login=None if email_account.no_smtp_authentication else login,
+                password=None if email_account.no_smtp_authentication else email_account.get_password(raise_exception=False),
+                use_ssl=email_account.use_ssl_for_outgoing,
+                use_tls=email_account.use_tls,
+                rate_limit=frappe.conf.get("workflow_email_smtp_rate_limit") or SMTP_RATE_LIMIT,
+            )
+        return pool
+
+
+def send_pooled_mail(recipients, subject, message, attachments=None, reference_doctype=None, reference_name=None):
+    """
+    Deliver one email to each recipient over the pooled SMTP sessions of the outgoing Email Account.
+    Each delivered copy is recorded in a Sent Email Queue entry, and recipients that still fail
+    after the retries are handed to the Email Queue, which retries them. Muted sites and tests go
+    straight to frappe.sendmail.
+
+    Only Workflow Emails use this. Reminder emails already go out through the Email Queue in
+    batches of up to 100 recipients per entry (see utils/notifications.fan_out) and are sent by
+    Frappe's queue flush rather than from inside the job. They are addressed to User IDs, which
+    the pool could not resolve.
+    """
+    from frappe.email.email_body import get_email
+    from frappe.email.smtp import get_outgoing_email_account
+
+    email_account = get_outgoing_email_account(append_to=reference_doctype)
+    if (
+        emails_muted()
+        or not email_account
+        or not email_account.smtp_server
+        or email_account.get("auth_method") == "OAuth"
+    ):
+        frappe.sendmail(
+            recipients=recipients, subject=subject, message=message, attachments=attachments,
+            reference_doctype=reference_doctype, reference_name=reference_name,
+        )
+        return
+
+    sender = email_account.default_sender
+    messages = [
+        (
+            email_account.email_id,
+            recipient,
+            get_email(
+                [recipient], sender=sender, msg=message, subject=subject,
+                attachments=attachments, email_account=email_account,
+            ).as_string(),
+        )
+        for recipient in recipients
+    ]
+
+    stats = deliver(messages, get_pool(email_account))
+    failed = set(stats.failed)
+    sent = [message for message in messages if message[1] not in failed]
+    if sent:
+        record_sent_mail(email_account, sent, reference_doctype, reference_name)
+
+    frappe.logger("workflow_transitions").info(
+        f"[SMTP Delivery] {reference_doctype} {reference_name} | {stats.sent}/{len(messages)} sent"
+        f" | {stats.elapsed * 1000:.1f} ms | avg latency {stats.latency * 1000:.1f} ms"
+        f" | {stats.throughput:.1f} msg/s"
+    )
+
+    if stats.failed:
+        frappe.sendmail(
+            recipients=stats.failed, subject=subject, message=message, attachments=attachments,
+            reference_doctype=reference_doctype, reference_name=reference_name,
+        )
+
+    return stats
+
+
+def emails_muted():
+    """Muted sites and test runs never reach the SMTP server, frappe.sendmail handles them."""
+    return bool(
+        frappe.flags.in_test
+        or frappe.flags.mute_emails
+        or frappe.conf.get("mute_emails")
+        or frappe.are_emails_muted()
+    )
+
+
+def record_sent_mail(email_account, messages, reference_doctype=None, reference_name=None):
+    """Sent Email Queue entry per (sender, recipient, content) delivered over the pool, with that recipient's copy."""
+    for _, recipient, content in messages:
+        frappe.get_doc({
+            "doctype": "Email Queue",
+            "sender": email_account.default_sender,
+            "email_account": email_account.name,
+            "status": "Sent",
+            "message": content,
+            "reference_doctype": reference_doctype,
+            "reference_name": reference_name,
+            "recipients": [{"recipient": recipient, "status": "Sent"}],
+        }).insert(ignore_permissions=True)
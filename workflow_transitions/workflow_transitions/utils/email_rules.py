@@ -0,0 +1,79 @@
+import frappe
+
+EMAIL_RULES_KEY = "workflow_transitions:workflow_email_rules"
+
+
+def get_email_rules(doctype, workflow_state):
+    """
+    Return the active Workflow Email Detail rows of `doctype` for `workflow_state` as dicts with
+    the rule name, condition, roles and pre-resolved static recipients. The index is kept in Redis
+    per doctype and dropped whenever a Workflow Email or User is saved.
+    """
+    rules = frappe.cache.hget(EMAIL_RULES_KEY, doctype)
+    if rules is None:
+        rules = build_email_rules(doctype)
+        frappe.cache.hset(EMAIL_RULES_KEY, doctype, rules)
+
+    return [frappe._dict(rule) for rule in rules.get(workflow_state, [])]
+
+
+def build_email_rules(doctype):
+    rules = {}
+    user_emails = {}
+    for name in frappe.get_all(
+        "Workflow Email",
+        filters={"document_type": doctype, "is_active": 1, "enable_email_notifications": 1},
+        pluck="name",
+    ):
+        workflow_email = frappe.get_doc("Workflow Email", name)
+        role_based = workflow_email.get("based_on") == "Role Based"
+
+        roles, users = [], []
+        if role_based:
+            roles = split_lines(workflow_email.get("roles"), "roles")
+        else:
+            users = split_lines(workflow_email.get("users"), "users")
+
+        for wf in workflow_email.get("workflows") or []:
+            if not wf.get("workflow_state"):
+                continue
+
+            conditional_doctype = wf.get("conditional_doctype")
+            document_no = wf.get("document_no")
+            rules.setdefault(wf.workflow_state, []).append({
+                "workflow_email": workflow_email.name,
+                "workflow_state": wf.workflow_state,
+                "conditional_field": conditional_doctype.lower().replace(" ", "_") if conditional_doctype and document_no else None,
+                "document_no": document_no,
+                "roles": roles,
+                "users": users,
+                "extra_emails": [e.strip() for e in (wf.get("user") or "").split(",") if "@" in e],
+            })
+            user_emails.update((user, None) for user in users if "@" not in user)
+
+    # Resolve every User ID referenced by the rules in one query
+    if user_emails:
+        user_emails.update(frappe.get_all(
+            "User", filters={"name": ["in", list(user_emails)]}, fields=["name", "email"], as_list=True
+        ))
+
+    for state_rules in rules.values():
+        for rule in state_rules:
+            recipients = [user if "@" in user else user_emails.get(user) for user in rule.pop("users")]
+            rule["recipients"] = [email for email in recipients + rule.pop("extra_emails") if email]
+
+    return rules
+
+
+def split_lines(value, fieldname):
+    """Normalize a newline separated field or a child table into a list of values."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [line.strip() for line in value.split("\n") if line.strip()]
+    # Email Roles / Email Users rows keep the value in a field named like the table
+    return [row if isinstance(row, str) else row.get(fieldname) for row in value]
+
+
+def clear_email_rules():
+    frappe.cache.delete_value(EMAIL_RULES_KEY)
@@ -0,0 +1,60 @@
+import frappe
+
+EMAIL_TEMPLATE_KEY = "workflow_transitions:workflow_email_template"
+
+# (site, Workflow Email) -> (modified, compiled code object), reused across jobs of this worker
+_local_templates = {}
+
+
+def get_message_template(workflow_email):
+    """
+    Return the Jinja template of a Workflow Email's message. The generated Python source is shared
+    through Redis and its compiled code kept in process memory, both keyed by `modified`. The template
+    is bound to this job's environment on every call, since its globals hold the current site's
+    database connection and session.
+    """
+    from frappe.utils.jinja import get_jenv
+
+    jenv = get_jenv()
+    return jenv.template_class.from_code(jenv, get_message_code(jenv, workflow_email), jenv.make_globals(None))
+
+
+def get_message_code(jenv, workflow_email):
+    modified = str(workflow_email.modified)
+    key = (frappe.local.site, workflow_email.name)
+    cached = _local_templates.get(key)
+    if cached and cached[0] == modified:
+        return cached[1]
+
+    source = frappe.cache.hget(EMAIL_TEMPLATE_KEY, workflow_email.name)
+    if not source or source[0] != modified:
+        source = (modified, compile_message(jenv, workflow_email.message))
+        frappe.cache.hset(EMAIL_TEMPLATE_KEY, workflow_email.name, source)
+
+    code = compile(source[1], f"<Workflow Email {workflow_email.name}>", "exec")
+    _local_templates[key] = (modified, code)
+    return code
+
+
+def compile_message(jenv, message):
+    if not message:
+        frappe.throw("Email message template is empty")
+    # Same guard as frappe.render_template
+    if ".__" in message:
+        frappe.throw("Illegal template")
+    return jenv.compile(message, raw=True)
+
+
+def render_message(workflow_email, doc):
+    return get_message_template(workflow_email).render({"doc": doc})
+
+
+def render_messages(workflow_email, docs):
+    """Render one Workflow Email message for many documents with a single compiled template."""
+    template = get_message_template(workflow_email)
+    return [template.render({"doc": doc}) for doc in docs]
+
+
+def clear_message_template(workflow_email_name):
+    frappe.cache.hdel(EMAIL_TEMPLATE_KEY, workflow_email_name)
+    _local_templates.pop((frappe.local.site, workflow_email_name), None)
@@ -0,0 +1,65 @@
+import time
+
+import frappe
+from frappe.utils import now
+
+# Recipients per Email Queue entry
+EMAIL_BATCH_SIZE = 100
+
+NOTIFICATION_LOG_FIELDS = (
+    "name", "creation", "modified", "modified_by", "owner", "docstatus",
+    "subject", "for_user", "type", "document_type", "document_name", "read",
+)
+
+
+def fan_out(users, doctype_name, document_name, subject, email_subject, email_body, batch_size=EMAIL_BATCH_SIZE):
+    """
+    Notify `users` about one document: a single bulk insert for their Notification Logs
+    and one Email Queue entry per `batch_size` recipients. Returns the per-batch timings.
+    """
+    users = list(dict.fromkeys(user for user in users if user))
+    if not users:
+        return []
+
+    timings = []
+    started = time.monotonic()
+    insert_notification_logs(users, doctype_name, document_name, subject)
+    timings.append(("notification_log", len(users), time.monotonic() - started))
+
+    for start in range(0, len(users), batch_size):
+        batch = users[start:start + batch_size]
+        started = time.monotonic()
+        frappe.sendmail(
+            recipients=batch,
+            subject=email_subject,
+            message=email_body,
+            reference_doctype=doctype_name,
+            reference_name=document_name,
+            now=frappe.flags.in_test,
+        )
+        timings.append(("email_queue", len(batch), time.monotonic() - started))
+
+    logger = frappe.logger("workflow_transitions")
+    for stage, size, elapsed in timings:
+        logger.info(f"[Reminder Fan-out] {doctype_name} {document_name} | {stage} | {size} recipients | {elapsed * 1000:.1f} ms")
+
+    return timings
+
+
+def insert_notification_logs(users, doctype_name, document_name, subject):
+    """Insert one Alert Notification Log per user in a single statement and notify their desks."""
+    timestamp = now()
+    owner = frappe.session.user
+    values = [
+        (
+            frappe.generate_hash(length=10), timestamp, timestamp, owner, owner, 0,
+            subject, user, "Alert", doctype_name, document_name, 0,
+        )
+        for user in users
+    ]
+    frappe.db.bulk_insert("Notification Log", NOTIFICATION_LOG_FIELDS, values)
+
+    # What Notification Log.after_insert does for each row, minus its per-user email
+    frappe.db.set_value("Notification Settings", {"name": ["in", users]}, "seen", 0, update_modified=False)
+    for user in users:
+        frappe.publish_realtime("notification", after_commit=True, user=user)
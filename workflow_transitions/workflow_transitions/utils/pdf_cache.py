@@ -0,0 +1,73 @@
+import hashlib
+import time
+
+import frappe
+from frappe.utils.synchronization import filelock
+
+PDF_INDEX_KEY = "workflow_transitions:pdf_index"
+PDF_CACHE_PREFIX = "workflow_transitions:pdf:"
+
+# Upper bound for all cached PDFs together, oldest entries are evicted first
+PDF_CACHE_MAX_BYTES = 64 * 1024 * 1024
+PDF_CACHE_EXPIRY = 6 * 60 * 60
+
+
+def get_pdf(doc, print_format):
+    """
+    Return the PDF of `doc` in `print_format`, rendering it at most once per document version.
+    Concurrent jobs asking for the same PDF wait on a lock and reuse the first render.
+    """
+    digest = get_pdf_digest(doc.doctype, doc.name, doc.modified, print_format)
+
+    pdf = frappe.cache.get_value(PDF_CACHE_PREFIX + digest)
+    if pdf is not None:
+        return pdf
+
+    with filelock(f"workflow_email_pdf_{digest}", timeout=120):
+        # Another job may have rendered it while we waited
+        pdf = frappe.cache.get_value(PDF_CACHE_PREFIX + digest)
+        if pdf is not None:
+            return pdf
+
+        pdf = frappe.get_print(doc.doctype, doc.name, print_format, as_pdf=True)
+        store_pdf(digest, pdf)
+
+    return pdf
+
+
+def get_pdf_digest(doctype, name, modified, print_format):
+    key = "\0".join(str(part) for part in (doctype, name, modified, print_format))
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def store_pdf(digest, pdf):
+    if len(pdf) > PDF_CACHE_MAX_BYTES:
+        return
+
+    frappe.cache.set_value(PDF_CACHE_PREFIX + digest, pdf, expires_in_sec=PDF_CACHE_EXPIRY)
+    frappe.cache.hset(PDF_INDEX_KEY, digest, (len(pdf), time.time()))
+    evict_pdfs()
+
+
+def evict_pdfs():
+    """Drop the oldest cached PDFs until the cache fits in PDF_CACHE_MAX_BYTES."""
+    index = frappe.cache.hgetall(PDF_INDEX_KEY) or {}
+    now = time.time()
+
+    entries = []
+    for digest, entry in index.items():
+        digest = frappe.safe_decode(digest)
+        if not entry or entry[1] + PDF_CACHE_EXPIRY < now:
+            # Already expired in Redis
+            frappe.cache.hdel(PDF_INDEX_KEY, digest)
+            continue
+        entries.append((entry[1], entry[0], digest))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, digest in sorted(entries):
+        if total <= PDF_CACHE_MAX_BYTES:
+            break
+        frappe.cache.delete_value(PDF_CACHE_PREFIX + digest)
+        frappe.cache.hdel(PDF_INDEX_KEY, digest)
+        total -= size
+
@@ -0,0 +1,121 @@
+import hashlib
+import json
+
+import frappe
+
+LAST_TRANSITION_KEY = "workflow_transitions:last_transition"
+REPORT_CACHE_PREFIX = "workflow_transitions:report_cache:"
+
+# Each (report, filters) result expires on its own, so one-off filters and pages do not pile up
+REPORT_CACHE_EXPIRY = 24 * 60 * 60
+
+# Doctypes with more transitions than this are refreshed in a background job
+LARGE_DOCTYPE_TRANSITIONS = 200_000
+
+
+def get_last_transition(doctype_name):
+    """Latest transition time recorded for `doctype_name`, as stored when a transition is saved."""
+    last_transition = frappe.cache.hget(LAST_TRANSITION_KEY, doctype_name)
+    if last_transition is None:
+        last_transition = str(frappe.db.sql(
+            """
+            SELECT MAX(sci.modification_time)
+            FROM `tabState Change Items` AS sci
+            JOIN `tabState Change` AS sc ON sc.name = sci.parent
+            WHERE sc.doctype_name = %s
+            """,
+            (doctype_name,),
+        )[0][0])
+        frappe.cache.hset(LAST_TRANSITION_KEY, doctype_name, last_transition)
+
+    return last_transition
+
+
+def set_last_transition(doctype_name, modification_time):
+    """
+    Move the doctype's report cache version to `modification_time` once the transition is committed,
+    so a report run inside the transaction never caches rows under the new version. Older results
+    are kept so large doctypes can show them while they are refreshed.
+    """
+    frappe.db.after_commit.add(
+        lambda: frappe.cache.hset(LAST_TRANSITION_KEY, doctype_name, str(modification_time))
+    )
+
+
+def clear_report_cache(doctype_names):
+    """
+    Move the report cache version of `doctype_names` past every cached result, for changes made
+    outside a transition, such as a rollup rebuild. Call it once those changes are committed.
+    """
+    version = f"cleared:{frappe.utils.now()}"
+    for doctype_name in doctype_names:
+        frappe.cache.hset(LAST_TRANSITION_KEY, doctype_name, version)
+
+
+def get_cached_report(report_name, filters, method):
+    """
+    Return the result of the report function at dotted path `method` for `filters`, cached per
+    (report, filters) until a new transition is recorded for the filtered doctype.
+
+    Doctypes with more than LARGE_DOCTYPE_TRANSITIONS transitions are recomputed in a background
+    job instead, and the last result is shown meanwhile with a note about its age.
+    """
+    doctype_name = filters.get("doctype")
+    if not doctype_name:
+        return frappe.get_attr(method)(filters)
+
+    key = get_report_key(report_name, filters)
+    version = get_last_transition(doctype_name)
+    cached = frappe.cache.get_value(get_cache_key(doctype_name, key))
+    if cached and cached["version"] == version:
+        return cached["result"]
+
+    if get_transition_count(doctype_name) <= LARGE_DOCTYPE_TRANSITIONS:
+        return refresh_report(report_name, filters, method, version)
+
+    frappe.enqueue(
+        refresh_report,
+        queue="long",
+        job_id=f"workflow_transitions:report:{key}",
+        deduplicate=True,
+        report_name=report_name,
+        filters=dict(filters),
+        method=method,
+    )
+
+    if cached:
+        columns, data = cached["result"][:2]
+        message = f"Refreshing in the background, showing results as of the transition at {cached['version']}."
+        return columns, data, message
+
+    return [], [], "This report is being prepared in the background, please refresh in a few minutes."
+
+
+def refresh_report(report_name, filters, method, version=None):
+    """Run the report and cache it under the doctype's last transition time read before it ran."""
+    doctype_name = filters.get("doctype")
+    version = version or get_last_transition(doctype_name)
+
+    result = frappe.get_attr(method)(frappe._dict(filters))
+    frappe.cache.set_value(
+        get_cache_key(doctype_name, get_report_key(report_name, filters)),
+        {"version": version, "result": result},
+        expires_in_sec=REPORT_CACHE_EXPIRY,
+    )
+    return result
+
+
+def get_cache_key(doctype_name, report_key):
+    return f"{REPORT_CACHE_PREFIX}{doctype_name}:{report_key}"
+
+
+def get_report_key(report_name, filters):
+    payload = json.dumps([report_name, filters], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def get_transition_count(doctype_name):
+    return frappe.db.sql(
+        "SELECT IFNULL(SUM(transition_count), 0) FROM `tabState Change` WHERE doctype_name = %s",
+        (doctype_name,),
+    )[0][0]
@@ -0,0 +1,92 @@
+import frappe
+
+from workflow_transitions.workflow_transitions.utils.email_rules import clear_email_rules
+
+ROLE_USERS_KEY = "workflow_transitions:role_users"
+
+
+def get_role_users(roles):
+    """
+    Return the enabled System Users holding any of `roles` as dicts with
+    user, email, full_name and role. Members are cached per role in Redis.
+    """
+    roles = list(dict.fromkeys(role for role in roles if role))
+    members = {role: frappe.cache.hget(ROLE_USERS_KEY, role) for role in roles}
+
+    missing = [role for role, users in members.items() if users is None]
+    if missing:
+        built = build_role_users(missing)
+        for role in missing:
+            members[role] = built.get(role, [])
+            frappe.cache.hset(ROLE_USERS_KEY, role, members[role])
+
+    return [frappe._dict(user) for role in roles for user in members[role]]
+
+
+def get_recipient_emails(roles=None, users=None):
+    """
+    Return the deduplicated email addresses of the enabled users holding any of `roles` plus
+    `users`, which may be email addresses or User IDs. User IDs are resolved in one query.
+    """
+    emails = [user.email for user in get_role_users(roles or [])]
+
+    user_ids = []
+    for user in users or []:
+        if not user:
+            continue
+        if "@" in user:
+            emails.append(user)
+        else:
+            user_ids.append(user)
+
+    if user_ids:
+        emails.extend(frappe.get_all(
+            "User",
+            filters={"name": ["in", user_ids], "enabled": 1, "email": ["is", "set"]},
+            pluck="email",
+        ))
+
+    seen = set()
+    return [email for email in emails if email and not (email in seen or seen.add(email))]
+
+
+def build_role_users(roles):
+    rows = frappe.db.sql(
+        """
+        SELECT hr.role, u.name AS user, u.email, IFNULL(u.full_name, '') AS full_name
+        FROM `tabHas Role` hr
+        JOIN `tabUser` u ON u.name = hr.parent
+        WHERE hr.parenttype = 'User' AND hr.role IN %(roles)s
+            AND u.enabled = 1 AND u.user_type = 'System User'
+        ORDER BY hr.creation
+        """,
+        {"roles": tuple(roles)},
+        as_dict=True,
+    )
+
+    members = {}
+    for row in rows:
+        members.setdefault(row.role, []).append(dict(row))
+    return members
+
+
+def clear_role_users(roles=None):
+    if roles is None:
+        frappe.cache.delete_value(ROLE_USERS_KEY)
+        return
+
+    for role in set(roles):
+        frappe.cache.hdel(ROLE_USERS_KEY, role)
+
+
+def on_user_change(doc, method=None):
+    """Drop the cached members of every role the user holds or held before this save."""
+    roles = {row.role for row in doc.get("roles") or []}
+    doc_before_save = doc.get_doc_before_save()
+    if doc_before_save:
+        roles.update(row.role for row in doc_before_save.get("roles") or [])
+
+    clear_role_users(roles)
+
+    # Workflow Email rules keep User IDs resolved to email addresses
+    clear_email_rules()
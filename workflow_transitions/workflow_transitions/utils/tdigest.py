@@ -0,0 +1,91 @@
+import numpy as np
+
+# Centroids kept per digest is roughly proportional to this
+DEFAULT_COMPRESSION = 100
+
+
+class TDigest:
+    """
+    A mergeable t-digest built with vectorized NumPy operations.
+
+    Centroids are sized with the arcsine scale function, so the tails keep small
+    centroids and p90/p99 stay accurate after any number of merges.
+    """
+
+    def __init__(self, means=None, weights=None, minimum=None, maximum=None, compression=DEFAULT_COMPRESSION):
+        self.means = np.asarray(means if means is not None else [], dtype=float)
+        self.weights = np.asarray(weights if weights is not None else [], dtype=float)
+        self.min = minimum
+        self.max = maximum
+        self.compression = compression
+
+    @classmethod
+    def from_values(cls, values, compression=DEFAULT_COMPRESSION):
+        values = np.asarray(values, dtype=float)
+        if not len(values):
+            return cls(compression=compression)
+        digest = cls(values, np.ones(len(values)), values.min(), values.max(), compression)
+        return digest.compress()
+
+    @classmethod
+    def merge_all(cls, digests, compression=DEFAULT_COMPRESSION):
+        digests = [digest for digest in digests if digest.count]
+        if not digests:
+            return cls(compression=compression)
+        return cls(
+            np.concatenate([digest.means for digest in digests]),
+            np.concatenate([digest.weights for digest in digests]),
+            min(digest.min for digest in digests),
+            max(digest.max for digest in digests),
+            compression,
+        ).compress()
+
+    @property
+    def count(self):
+        return float(self.weights.sum())
+
+    def merge(self, other):
+        return TDigest.merge_all([self, other], self.compression)
+
+    def compress(self):
+        if len(self.means) <= 1:
+            return self
+
+        order = np.argsort(self.means, kind="mergesort")
+        means, weights = self.means[order], self.weights[order]
+        total = weights.sum()
+
+        # Position of each centroid's midpoint on the arcsine scale; a new cluster starts at every unit of k
+        q = (np.cumsum(weights) - weights / 2) / total
+        k = self.compression / np.pi * np.arcsin(2 * q - 1)
+        clusters = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, clusters[1:] != clusters[:-1]])
+
+        cluster_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / cluster_weights
+        self.weights = cluster_weights
+        return self
+
+    def quantile(self, q):
+        """Estimated value at quantile(s) `q` in [0, 1]."""
+        if not self.count:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float("nan")
+
+        cumulative = np.cumsum(self.weights)
+        centers = cumulative - self.weights / 2
+        positions = np.r_[0.0, centers, cumulative[-1]]
+        values = np.r_[self.min, self.means, self.max]
+        result = np.interp(np.asarray(q, dtype=float) * cumulative[-1], positions, values)
+        return result if np.ndim(q) else float(result)
+
+    def to_dict(self):
+        return {
+            "means": np.round(self.means, 3).tolist(),
+            "weights": self.weights.tolist(),
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data, compression=DEFAULT_COMPRESSION):
+        return cls(data["means"], data["weights"], data["min"], data["max"], compression)
@@ -0,0 +1,57 @@
+import frappe
+
+TRANSITION_CONFIG_KEY = "workflow_transitions:transition_config"
+
+
+def get_transition_config(doctype):
+    """Return the transition handlers enabled for `doctype`, or None when there is nothing to run."""
+    if frappe.flags.in_install or frappe.flags.in_migrate:
+        return None
+
+    config = frappe.cache.get_value(TRANSITION_CONFIG_KEY, generator=build_transition_config)
+    return (config or {}).get(doctype)
+
+
+def build_transition_config():
+    config = {}
+    compatibility_mode = set()
+    for workflow in frappe.get_all(
+        "Workflow",
+        filters={"is_active": 1},
+        fields=["document_type", "track_state_transitions", "reminder", "use_server_scripts"],
+    ):
+        # Workflows in compatibility mode are handled by their generated Server Scripts
+        if workflow.use_server_scripts:
+            compatibility_mode.add(workflow.document_type)
+            continue
+        if not (workflow.track_state_transitions or workflow.reminder):
+            continue
+
+        config[workflow.document_type] = frappe._dict(
+            track_state_transitions=workflow.track_state_transitions,
+            reminder=workflow.reminder,
+            workflow_email=0,
+        )
+
+    for document_type in frappe.get_all(
+        "Workflow Email",
+        filters={"is_active": 1, "enable_email_notifications": 1},
+        pluck="document_type",
+        distinct=True,
+    ):
+        if document_type in compatibility_mode:
+            continue
+        config.setdefault(
+            document_type,
+            frappe._dict(track_state_transitions=0, reminder=0),
+        ).workflow_email = 1
+
+    return config
+
+
+def is_compatibility_mode(doctype):
+    return bool(frappe.db.get_value("Workflow", {"document_type": doctype, "is_active": 1}, "use_server_scripts"))
+
+
+def clear_transition_config():
+    frappe.cache.delete_value(TRANSITION_CONFIG_KEY)
@@ -0,0 +1,127 @@
+import frappe
+
+from workflow_transitions.workflow_transitions.utils.conditions import evaluate_condition
+
+GRAPH_VERSION_KEY = "workflow_transitions:workflow_graph_version"
+GRAPH_CACHE_KEY = "workflow_transitions:workflow_graph"
+
+# Stored as the version of doctypes without an active Workflow
+NO_WORKFLOW = "none"
+
+# doctype -> WorkflowGraph, reused across requests until the Workflow is modified
+_local_graphs = {}
+
+
+class WorkflowGraph:
+    """Read-only view of the active Workflow of a doctype."""
+
+    def __init__(self, data):
+        self.name = data["name"]
+        self.document_type = data["document_type"]
+        self.modified = data["modified"]
+        self.send_email_as_project_condition = data["send_email_as_project_condition"]
+        self.states = [frappe._dict(state) for state in data["states"]]
+        self.transitions = [frappe._dict(transition) for transition in data["transitions"]]
+
+        self.allow_edit = {}
+        for state in self.states:
+            if state.allow_edit:
+                self.allow_edit.setdefault(state.state, []).append(state.allow_edit)
+
+        self.transitions_from = {}
+        for transition in self.transitions:
+            self.transitions_from.setdefault(transition.state, []).append(transition)
+
+    def get_allow_edit_roles(self, state):
+        return self.allow_edit.get(state, [])
+
+    def get_allow_edit_role(self, state):
+        roles = self.get_allow_edit_roles(state)
+        return roles[0] if roles else None
+
+    def get_transitions_from(self, state):
+        return self.transitions_from.get(state, [])
+
+    def get_next_roles(self, state, doc, on_error=None):
+        """Roles allowed on the transitions out of `state` whose condition holds for `doc`."""
+        next_roles = set()
+        for transition in self.get_transitions_from(state):
+            if transition.condition:
+                try:
+                    if not evaluate_condition(transition.condition, {"doc": doc}):
+                        continue
+                except Exception as e:
+                    if not on_error:
+                        raise
+                    on_error(transition, e)
+                    continue
+            if transition.allowed:
+                next_roles.add(transition.allowed)
+        return next_roles
+
+
+def get_workflow_graph(doctype):
+    """Return the WorkflowGraph of the active Workflow for `doctype`, or None.
+
+    The graph is kept in Redis and in process memory, versioned by the Workflow's
+    `modified` timestamp and dropped from Redis whenever a Workflow is saved.
+    """
+    version = frappe.cache.hget(GRAPH_VERSION_KEY, doctype)
+    if version == NO_WORKFLOW:
+        return None
+
+    graph = _local_graphs.get(doctype)
+    if version and graph and graph.modified == version:
+        return graph
+
+    data = frappe.cache.hget(GRAPH_CACHE_KEY, doctype) if version else None
+    if not data or data["modified"] != version:
+        data = build_workflow_graph(doctype)
+        frappe.cache.hset(GRAPH_CACHE_KEY, doctype, data)
+        frappe.cache.hset(GRAPH_VERSION_KEY, doctype, data["modified"] if data else NO_WORKFLOW)
+
+    if not data:
+        _local_graphs.pop(doctype, None)
+        return None
+
+    graph = _local_graphs[doctype] = WorkflowGraph(data)
+    return graph
+
+
+def build_workflow_graph(doctype):
+    workflow = frappe.db.get_value(
+        "Workflow",
+        {"document_type": doctype, "is_active": 1},
+        ["name", "document_type", "modified", "send_email_as_project_condition"],
+        as_dict=True,
+    )
+    if not workflow:
+        return None
+
+    states = frappe.get_all(
+        "Workflow Document State",
+        filters={"parent": workflow.name, "parenttype": "Workflow"},
+        fields=["state", "doc_status", "allow_edit", "update_field", "update_value"],
+        order_by="idx",
+    )
+    transitions = frappe.get_all(
+        "Workflow Transition",
+        filters={"parent": workflow.name, "parenttype": "Workflow"},
+        fields=["state", "action", "next_state", "allowed", "allow_self_approval", "condition"],
+        order_by="idx",
+    )
+    for transition in transitions:
+        transition.condition = (transition.condition or "").strip() or None
+
+    return {
+        "name": workflow.name,
+        "document_type": workflow.document_type,
+        "modified": str(workflow.modified),
+        "send_email_as_project_condition": workflow.send_email_as_project_condition,
+        "states": [dict(state) for state in states],
+        "transitions": [dict(transition) for transition in transitions],
+    }
+
+
+def clear_workflow_graph():
+    frappe.cache.delete_value([GRAPH_VERSION_KEY, GRAPH_CACHE_KEY])